@@ -3,10 +3,26 @@ tests to run and debug your minimax and alphabeta agents locally.  The test
 cases used by the project assistant are not public.
 """
 
+import io
+import os
+import random
+import shutil
+import tempfile
 import unittest
 
 import isolation
+import isolation.endgame
+import batch_eval
+import benchmark
 import game_agent
+import competition_agent
+import sample_players
+import opening_book
+import parallel_agent
+import perft
+import tablebase
+import time_manager
+import transposition
 
 from importlib import reload
 
@@ -20,6 +36,584 @@ class IsolationTest(unittest.TestCase):
         self.player2 = "Player2"
         self.game = isolation.Board(self.player1, self.player2)
 
+    def test_bitboard_matches_board(self):
+        """BitBoard must generate the same positions as Board"""
+        bitboard = isolation.BitBoard(self.player1, self.player2)
+        for move in [(0, 0), (5, 5), (2, 1), (3, 4), (4, 2), (1, 3)]:
+            for player in (self.player1, self.player2):
+                self.assertEqual(sorted(self.game.get_legal_moves(player)),
+                                 sorted(bitboard.get_legal_moves(player)))
+            self.assertEqual(self.game.check(), bitboard.check())
+            self.assertEqual(self.game.to_string(), bitboard.to_string())
+            self.game.apply_move(move)
+            bitboard = bitboard.forecast_move(move)
+        self.assertEqual(self.game.get_blank_spaces(), bitboard.get_blank_spaces())
+        self.assertEqual(self.game.hash(), bitboard.hash())
+
+    def test_bitboard_symmetry_matches_board(self):
+        """BitBoard must find the same symmetries as Board"""
+        rng = random.Random(0)
+        for width, height in [(7, 7), (5, 5), (6, 4)]:
+            for _ in range(20):
+                board = isolation.Board(self.player1, self.player2, width, height, shuffle=False)
+                bitboard = isolation.BitBoard(self.player1, self.player2, width, height, shuffle=False)
+                while board.get_legal_moves():
+                    move = rng.choice(board.get_legal_moves())
+                    board.apply_move(move)
+                    bitboard = bitboard.forecast_move(move)
+                    if board.move_count >= 2: # both players placed
+                        self.assertEqual(board.issymmetrical(), bitboard.issymmetrical())
+
+        # player 2 to move on an odd board with the center still blank
+        bitboard = isolation.BitBoard(self.player1, self.player2, shuffle=False)
+        for move in [(0, 0), (6, 6), (1, 2)]:
+            bitboard.apply_move(move)
+        self.assertFalse(bitboard.issymmetrical())
+
+    def test_batch_scores_match_heuristics(self):
+        """Batch scores must match the heuristics, center aside at the end"""
+        rng = random.Random(0)
+        for _ in range(20):
+            game = isolation.Board(self.player1, self.player2)
+            boards = []
+            while game.get_legal_moves():
+                game.apply_move(rng.choice(game.get_legal_moves()))
+                if game.move_count >= 2: # custom_score needs placed players
+                    boards.append(game.copy())
+            for player in (self.player1, self.player2):
+                features = batch_eval.batch_evaluate(*batch_eval.boards_to_arrays(boards, player))
+                for board, mixed, quad, center in zip(boards, features['mixed'], features['quad'],
+                                                      features['center']):
+                    self.assertEqual(game_agent.custom_score(board, player), mixed)
+                    self.assertEqual(game_agent.custom_score_2(board, player), quad)
+                    if board.get_legal_moves():
+                        self.assertEqual(sample_players.center_score(board, player), center)
+                    else:
+                        # center_score is -inf / +inf once the game is over
+                        self.assertIn(sample_players.center_score(board, player), (float("-inf"), float("inf")))
+                        self.assertEqual(float("inf"), abs(mixed))
+                        self.assertLess(center, float("inf"))
+
+    def test_hash_is_incremental(self):
+        """reverse_move must restore the Zobrist key of the position"""
+        self.game.apply_move((0, 0))
+        self.game.apply_move((5, 5))
+        key = self.game.hash()
+        self.game.apply_move((2, 1))
+        self.assertNotEqual(key, self.game.hash())
+        self.game.reverse_move((0, 0), (2, 1))
+        self.assertEqual(key, self.game.hash())
+
+    def test_seeded_move_order(self):
+        """Boards with the same seed, and their copies, must list the moves in
+        the same order, and boards without shuffle in cell index order"""
+        moves = [(3, 3), (0, 0), (5, 4), (2, 1), (3, 2), (4, 3)]
+        for cls in (isolation.Board, isolation.BitBoard):
+            orders = []
+            for seed in [7, 7, 8]:
+                game = cls(self.player1, self.player2, seed=seed)
+                order = []
+                for move in moves:
+                    game.apply_move(move)
+                    order.append(game.get_legal_moves())
+                    order.append(game.copy().get_legal_moves())
+                    order.append(game.forecast_move(game.get_legal_moves()[0]).get_legal_moves())
+                data = game.to_bytes()
+                order.append(cls.from_bytes(data, self.player1, self.player2, seed=seed).get_legal_moves())
+                orders.append(order)
+            self.assertEqual(orders[0], orders[1])
+            self.assertNotEqual(orders[0], orders[2])
+
+            game = cls(self.player1, self.player2, shuffle=False)
+            for move in moves:
+                game.apply_move(move)
+                for board in (game, game.copy(), cls.from_bytes(game.to_bytes(), self.player1, self.player2,
+                                                                shuffle=False)):
+                    legal = board.get_legal_moves()
+                    self.assertEqual(sorted(legal, key=lambda move: move[0] + move[1] * 7), legal)
+
+    def test_undo_move_restores_opening(self):
+        """undo_move must take back opening placements as well"""
+        for board in (self.game, isolation.BitBoard(self.player1, self.player2)):
+            empty = board.to_string()
+            board.apply_move((3, 3))
+            board.apply_move((0, 0))
+            board.undo_move()
+            board.undo_move()
+            self.assertEqual(empty, board.to_string())
+            self.assertEqual(0, board.hash())
+            self.assertEqual(self.player1, board.active_player)
+            self.assertEqual(49, len(board.get_legal_moves()))
+
+    def test_count_moves_matches_legal_moves(self):
+        """The move counts kept up to date by apply_move, undo_move, copy and
+        reverse_move must match the legal moves"""
+        def check(board):
+            for player in (self.player1, self.player2):
+                self.assertEqual(len(board.get_legal_moves(player)), board.count_moves(player))
+
+        rng = random.Random(0)
+        for cls in (isolation.Board, isolation.BitBoard):
+            for _ in range(20):
+                board = cls(self.player1, self.player2, shuffle=False)
+                check(board) # first placements decrement the count of an unplaced opponent
+                while board.get_legal_moves():
+                    if rng.random() < .5:
+                        check(board) # fill the cached counts some of the time only
+                    move = rng.choice(board.get_legal_moves())
+                    previous = board.get_player_location(board.active_player)
+                    before = board.to_string()
+                    board.apply_move(move)
+                    check(board)
+                    if rng.random() < .3:
+                        board.undo_move()
+                        check(board)
+                        board.apply_move(move)
+                    if previous is not None and rng.random() < .3:
+                        # a copy has no undo stack, reverse_move takes the move back from the locations
+                        copy = board.copy()
+                        check(copy)
+                        copy.reverse_move(previous, move)
+                        self.assertEqual(before, copy.to_string())
+                        check(copy)
+                    if rng.random() < .2:
+                        board = board.copy()
+                check(board)
+
+    def test_canonical_hash_of_symmetric_positions(self):
+        """Every symmetric variant must share the canonical key and moves"""
+        moves = [(3, 2), (1, 5), (5, 3), (0, 3), (4, 5), (2, 4)]
+        for width, height in [(7, 7), (6, 4)]:
+            symmetries = isolation.isolation.get_symmetries(width, height)
+            self.assertEqual(8 if width == height else 4, len(symmetries))
+            game = isolation.Board(self.player1, self.player2, width, height)
+            for move in moves:
+                game.apply_move((move[0] % height, move[1] % width))
+            key, symmetry = game.canonical_hash()
+            for perm, _ in symmetries:
+                variant = isolation.Board(self.player1, self.player2, width, height)
+                for move in moves:
+                    idx = perm[move[0] % height + (move[1] % width) * height]
+                    variant.apply_move((idx % height, idx // height))
+                variant_key, variant_symmetry = variant.canonical_hash()
+                self.assertEqual(key, variant_key)
+                for move in game.get_legal_moves():
+                    canonical = game.canonical_move(move, symmetry)
+                    self.assertEqual(move, game.restore_move(canonical, symmetry))
+                    # the same move seen from the variant maps to the same canonical move
+                    idx = perm[move[0] + move[1] * height]
+                    self.assertEqual(canonical, variant.canonical_move((idx % height, idx // height),
+                                                                       variant_symmetry))
+
+    def test_partitioned_endgame(self):
+        """A partitioned position must be solved without searching"""
+        player = game_agent.AlphaBetaPlayer1(search_depth=1)
+        game = isolation.Board(self.player1, player)
+        for move in [(0, 4), (5, 1), (2, 3), (4, 3), (4, 4), (2, 4), (2, 5), (1, 2), (0, 6),
+                     (3, 1), (1, 4), (5, 2), (2, 6), (3, 3), (3, 4), (5, 4), (5, 3), (3, 5)]:
+            game.apply_move(move)
+        self.assertFalse(game.is_partitioned())
+        game.apply_move((4, 1))
+        self.assertTrue(game.is_partitioned())
+        self.assertFalse(game.get_region(self.player1) & game.get_region(player))
+
+        length, best = isolation.endgame.longest_path(game)
+        self.assertEqual(4, length)
+        self.assertEqual(best, player.get_move(game, lambda: 1e9))
+        self.assertEqual(0, player.stats.nodes)
+
+    def test_endgame_memo_is_bounded(self):
+        """The longest path memo must stay under its limit and be freed by
+        the players once the game is not partitioned"""
+        rng = random.Random(0)
+        game = isolation.Board(self.player1, self.player2, shuffle=False)
+        while not game.is_partitioned():
+            game.apply_move(rng.choice(game.get_legal_moves()))
+        isolation.endgame.clear_memo()
+        expected = isolation.endgame.longest_path(game)
+        memo = isolation.endgame._memo[(7, 7)]
+        self.assertGreater(len(memo), 100)
+
+        limit = isolation.endgame.MEMO_LIMIT
+        isolation.endgame.MEMO_LIMIT = 100
+        try:
+            isolation.endgame.clear_memo()
+            self.assertEqual(expected, isolation.endgame.longest_path(game))
+            self.assertLessEqual(len(isolation.endgame._memo[(7, 7)]), 100)
+        finally:
+            isolation.endgame.MEMO_LIMIT = limit
+
+        player = game_agent.AlphaBetaPlayer1(search_depth=2)
+        player.get_move(benchmark.make_position(player, benchmark.POSITIONS['midgame-1']), lambda: 1e9)
+        self.assertEqual({}, isolation.endgame._memo)
+
+    def test_endgame_solver_leaves_time_to_search(self):
+        """A player must still move when the clock is too short to solve a
+        partitioned position"""
+        moves = [(3, 4), (3, 2), (5, 5), (5, 1), (3, 6), (4, 3), (4, 4), (3, 1), (6, 5), (1, 2), (5, 3),
+                 (2, 4), (4, 1), (0, 5), (2, 2), (1, 3), (0, 1)]
+        for start in [150., 40.]:
+            player = game_agent.AlphaBetaPlayer1(search_depth=50, timeout=30.)
+            game = benchmark.make_position(player, moves)
+            self.assertTrue(game.is_partitioned())
+            isolation.endgame.clear_memo()
+            calls = []
+
+            def time_left():
+                # a clock losing a millisecond per call, the solver needs thousands
+                calls.append(None)
+                return start - len(calls)
+
+            self.assertIn(player.get_move(game, time_left), [(2, 1), (2, 5)])
+            self.assertGreater(player.stats.nodes, 0) # the solver gave up, the search moved
+        isolation.endgame.clear_memo()
+
+    def test_search_stats_per_move(self):
+        """Every move must export the counters of its search"""
+        player = game_agent.AlphaBetaPlayer1(search_depth=4)
+        game = isolation.Board(self.player1, player)
+        game.apply_move((3, 3))
+        game.apply_move((2, 2))
+        game.apply_move((1, 2))
+        player.get_move(game, lambda: 1e9)
+        stats = player.stats.moves[-1]
+        self.assertEqual(4, stats['depth'])
+        self.assertEqual([1, 2, 3, 4], [depth for depth, _, _ in stats['iterations']])
+        self.assertEqual(stats['nodes'], sum(nodes for _, _, nodes in stats['iterations']))
+        self.assertLess(stats['leaves'], stats['nodes'])
+        self.assertLessEqual(stats['tt_hits'], stats['tt_probes'])
+        self.assertGreater(sum(stats['cutoffs']), 0)
+        self.assertFalse(stats['timed_out'])
+
+    def test_perft_reference_counts(self):
+        """Both boards must generate the reference move trees"""
+        for name, fraction, depth in perft.POSITIONS:
+            for board_class in [isolation.Board, isolation.BitBoard]:
+                game = perft.make_position(board_class, 5, 5, fraction)
+                expected = perft.REFERENCE[(5, 5, name, depth)]
+                self.assertEqual(expected, perft.perft_forecast(game, depth))
+                self.assertEqual(expected, perft.perft_apply(game, depth))
+
+    def test_benchmark_is_deterministic(self):
+        """Benchmark runs must stop at their limits and repeat exactly"""
+        players = {'AlphaBetaPlayer1': game_agent.AlphaBetaPlayer1}
+        positions = {'midgame-1': benchmark.POSITIONS['midgame-1']}
+        first = benchmark.run(players, positions, depth=3, nodes=100, repeat=1, out=io.StringIO())
+        second = benchmark.run(players, positions, depth=3, nodes=100, repeat=1, out=io.StringIO())
+        self.assertEqual(3, first['AlphaBetaPlayer1/midgame-1/depth-3']['depth'])
+        self.assertEqual(101, first['AlphaBetaPlayer1/midgame-1/nodes-100']['nodes'])
+        regressions, _, changes = benchmark.compare(second, first, tolerance=float("inf"))
+        self.assertEqual([], regressions)
+        self.assertEqual([], changes)
+
+    def test_transposition_table_replacement(self):
+        """Deep entries must only give way to deeper or newer ones"""
+        table = transposition.TranspositionTable(4)
+        table.new_search()
+        table.store(1, "a", 5, transposition.EXACT, 1., (0, 0))
+        table.store(5, "b", 3, transposition.LOWER, 2., (1, 1)) # same bucket, shallower
+        self.assertEqual(5, table.probe(1, "a")[2])
+        self.assertEqual(transposition.LOWER, table.probe(5, "b")[3])
+        self.assertIsNone(table.probe(1, "b")) # collision rejected by the check
+        table.store(9, "c", 2, transposition.UPPER, 3., (2, 2))
+        self.assertIsNone(table.probe(5, "b")) # always-replace slot overwritten
+        self.assertEqual(5, table.probe(1, "a")[2])
+        table.store(13, "d", 7, transposition.EXACT, 4., (3, 3)) # deeper
+        self.assertIsNone(table.probe(1, "a"))
+        table.new_search()
+        table.store(1, "a", 1, transposition.EXACT, 5., (0, 0)) # older entries give way
+        self.assertEqual((1, "a", 1, transposition.EXACT, 5., (0, 0), 2), table.probe(1, "a"))
+        self.assertEqual(2, len(table))
+
+    def test_transposition_table_win_scores(self):
+        """Win scores stored by a search must be right at another root"""
+        player = game_agent.AlphaBetaPlayer1()
+        self.assertEqual(10e18 / 9, player.score_from_tt(player.score_to_tt(10e18 / 7, 3), 5))
+        self.assertEqual(-10e18 / 2, player.score_from_tt(player.score_to_tt(-10e18 / 4, 3), 1))
+        self.assertEqual(0.5, player.score_to_tt(0.5, 3))
+
+        moves = [(6, 5), (6, 0), (5, 3), (4, 1), (4, 5), (2, 2), (3, 3), (4, 3), (1, 4), (2, 4), (0, 6),
+                 (1, 6), (2, 5), (0, 4), (4, 6), (2, 3), (5, 4), (3, 1), (4, 2), (1, 0), (3, 4), (0, 2),
+                 (5, 5), (2, 1), (6, 3), (4, 0), (5, 1)]
+
+        def search(player, moves):
+            game = isolation.Board(self.player1, player, shuffle=False)
+            for move in moves:
+                game.apply_move(move)
+            player.time_left = lambda: 1e9
+            player.tt.new_search()
+            player.depth = 5
+            player.alphabeta(game, 5)
+            return player.best_score
+
+        player = game_agent.AlphaBetaPlayer1(search_depth=5)
+        search(player, moves + [(3, 2), (3, 0)]) # fills the table two plies below the root
+        self.assertEqual(search(game_agent.AlphaBetaPlayer1(search_depth=5), moves), search(player, moves))
+
+    def test_transposition_table_across_seats(self):
+        """Entries stored while playing one seat must be right in the other"""
+        moves = benchmark.POSITIONS['midgame-1']
+        for cls in (game_agent.AlphaBetaPlayer1, game_agent.PVSPlayer):
+            fresh = cls(search_depth=3, score_fn=sample_players.improved_score)
+            reply = benchmark.make_position(fresh, moves).get_legal_moves()[0]
+            expected = fresh.get_move(benchmark.make_position(fresh, moves + [reply]), lambda: 1e9)
+
+            player = cls(search_depth=4, score_fn=sample_players.improved_score)
+            player.get_move(benchmark.make_position(player, moves), lambda: 1e9) # as player 1
+            player.search_depth = 3
+            self.assertEqual(expected, player.get_move(benchmark.make_position(player, moves + [reply]),
+                                                       lambda: 1e9)) # as player 2
+            self.assertEqual(fresh.best_score, player.best_score)
+            self.assertLess(player.stats.nodes, fresh.stats.nodes) # answered by the table
+
+    def test_aspiration_research(self):
+        """A search failing its aspiration window must end with the full
+        window result"""
+        moves = benchmark.POSITIONS['midgame-2']
+        expected = game_agent.AlphaBetaPlayer1(search_depth=5, aspiration_window=None)
+        game = benchmark.make_position(expected, moves)
+        expected.get_move(game, lambda: 1e9)
+
+        for offset in [-1., 1.]: # fail high, then fail low
+            player = game_agent.AlphaBetaPlayer1(search_depth=5, aspiration_window=.01, aspiration_growth=2.)
+            game = benchmark.make_position(player, moves)
+            player.time_left = lambda: 1e9
+            player.depth = 5
+            player.best_score = expected.best_score + offset # previous iteration far from the score
+            windows = []
+            search = player.alphabeta
+
+            def alphabeta(game, depth, alpha=float("-inf"), beta=float("inf")):
+                windows.append((alpha, beta))
+                return search(game, depth, alpha, beta)
+            player.alphabeta = alphabeta
+            player.aspiration_search(game, 5)
+            self.assertGreater(len(windows), 2)
+            self.assertEqual(expected.best_score, player.best_score)
+            self.assertTrue(windows[-1][0] < player.best_score < windows[-1][1])
+
+    def test_killer_and_history_ordering(self):
+        """Killer moves must come first and ordering must not change the
+        result"""
+        player = game_agent.AlphaBetaPlayer1()
+        game = benchmark.make_position(player, benchmark.POSITIONS['midgame-1'])
+        check = game.check()
+        moves = game.get_legal_moves()
+        player.start_move_ordering(game)
+        player.record_cutoff(moves[-1], game, check, 3, 2)
+        player.record_cutoff(moves[-2], game, check, 1, 4)
+        ordered = list(moves)
+        player.order_by_history(ordered, game, check, 2)
+        self.assertEqual(moves[-1], ordered[0])
+        ordered = list(moves)
+        player.order_by_history(ordered, game, check, 4)
+        self.assertEqual([moves[-2], moves[-1]], ordered[:2]) # killer of the ply, then history
+        player.start_move_ordering(game) # next move: killers reset, history halved
+        self.assertEqual([None, None], player.killers[2])
+        self.assertEqual(4 + 0, sum(player.history)) # 3 * 3 and 1 * 1 halved
+
+        for name in ['midgame-1', 'midgame-3', 'endgame-2']:
+            results = []
+            for ordering in [True, False]:
+                player = game_agent.AlphaBetaPlayer1(search_depth=6)
+                if not ordering:
+                    player.order_by_history = lambda actions, game, check, ply: None
+                    player.record_cutoff = lambda move, game, check, depth, ply: None
+                game = benchmark.make_position(player, benchmark.POSITIONS[name])
+                results.append((player.get_move(game, lambda: 1e9), player.best_score, player.stats.nodes))
+            self.assertEqual(results[0][:2], results[1][:2])
+            self.assertLessEqual(results[0][2], results[1][2])
+
+    def test_pvs_matches_alphabeta(self):
+        """PVS must find the root value of AlphaBetaPlayer1"""
+        for name in ['midgame-1', 'midgame-4', 'endgame-2']:
+            scores = []
+            for cls in [game_agent.AlphaBetaPlayer1, game_agent.PVSPlayer]:
+                player = cls(search_depth=6)
+                game = benchmark.make_position(player, benchmark.POSITIONS[name])
+                player.get_move(game, lambda: 1e9)
+                self.assertEqual(6, player.stats.depth)
+                scores.append(player.best_score)
+            self.assertAlmostEqual(scores[0], scores[1])
+
+    def test_root_split_matches_alphabeta(self):
+        """The workers together must find the root value of AlphaBetaPlayer1"""
+        moves = benchmark.POSITIONS['midgame-1']
+        # setUp reloads game_agent, the workers need a score function they can unpickle
+        score_fn = sample_players.improved_score
+        expected = game_agent.AlphaBetaPlayer1(search_depth=4, score_fn=score_fn)
+        expected.get_move(benchmark.make_position(expected, moves), lambda: 1e9)
+        with parallel_agent.RootSplitPlayer(search_depth=4, score_fn=score_fn, workers=2) as player:
+            self.assertIsNotNone(player.pool)
+            game = benchmark.make_position(player, moves)
+            move = player.get_move(game, lambda: 1e5)
+            self.assertIn(move, game.get_legal_moves())
+            self.assertEqual(4, player.stats.depth)
+            self.assertAlmostEqual(expected.best_score, player.best_score)
+        self.assertIsNone(player.pool)
+
+    def test_ponder_hit(self):
+        """The search of the pondered reply must reuse the pondering results"""
+        with parallel_agent.PonderingPlayer(search_depth=4, score_fn=sample_players.improved_score,
+                                            ponder_time=60000.) as player:
+            moves = benchmark.POSITIONS['midgame-2']
+            game = benchmark.make_position(player, moves)
+            game._notify_players(moves[-1]) # the opponent moved: nothing to ponder
+            self.assertIsNone(player.ponder)
+            move = game.get_legal_moves()[0]
+            game.apply_move(move)
+            game._notify_players(move)
+            self.assertEqual(4, player.ponder.result()) # every reply searched to depth 4
+
+            reply = game.get_legal_moves()[-1]
+            game.apply_move(reply)
+            game._notify_players(reply) # stops pondering
+            self.assertIsNone(player.ponder)
+            entry = player.tt.probe(game.hash(), game.check())
+            self.assertEqual((4, transposition.EXACT), entry[2:4])
+            player.get_move(game, lambda: 1e9)
+            # every iteration is answered by the root entry
+            self.assertEqual(4, player.stats.depth)
+            self.assertEqual(4, player.stats.nodes)
+            self.assertEqual(4, player.stats.tt_hits)
+            self.assertEqual(entry[5], player.get_move(game, lambda: 1e9))
+
+    def test_shared_table_round_trip(self):
+        """Entries of the shared table must be visible to attached tables"""
+        table = transposition.SharedTranspositionTable(100)
+        try:
+            table.new_search()
+            table.store(12345, None, 3, transposition.LOWER, 2.5, (6, 5))
+            attached = transposition.SharedTranspositionTable(table.size, name=table.name)
+            self.assertEqual((12345, "check", 3, transposition.LOWER, 2.5, (6, 5), 1),
+                             attached.probe(12345, "check"))
+            self.assertIsNone(attached.probe(12345 + table.size, "check"))
+            # scores are not rounded: bounds must compare like in TranspositionTable
+            attached.store(777, None, 2, transposition.UPPER, 1 / 3, None)
+            self.assertEqual((777, "check", 2, transposition.UPPER, 1 / 3, None, 1), table.probe(777, "check"))
+            self.assertEqual(2, len(table))
+            attached.close()
+        finally:
+            table.close()
+
+    def test_time_manager_skips_long_iterations(self):
+        """The next iteration must be predicted from the branching factor"""
+        clock = [1000.]
+        manager = time_manager.TimeManager(soft_fraction=0.4)
+        manager.start(lambda: clock[0], 100., 8)
+        for spent, nodes in [(10., 10), (30., 40), (90., 130)]:
+            clock[0] -= spent
+            manager.iteration_done((1, 2), nodes)
+        self.assertAlmostEqual(3., manager.branching)
+        self.assertAlmostEqual(270., manager.predicted())
+        self.assertFalse(manager.can_start_iteration()) # 130 + 270 > 360
+        manager.iteration_done((2, 1), 130)
+        self.assertTrue(manager.unstable)
+        self.assertEqual(900., manager.limit())
+
+    def test_untimed_search_reaches_search_depth(self):
+        """A time_left returning infinity must not stop iterative deepening"""
+        manager = time_manager.TimeManager()
+        manager.start(lambda: float("inf"), 30., 8)
+        for nodes in [10, 40, 130]:
+            manager.iteration_done((1, 2), nodes)
+        self.assertEqual(0., manager.elapsed())
+        self.assertTrue(manager.can_start_iteration())
+
+        for cls in [game_agent.AlphaBetaPlayer1, game_agent.PVSPlayer]:
+            player = cls(search_depth=5)
+            game = benchmark.make_position(player, benchmark.POSITIONS['midgame-3'])
+            player.get_move(game, lambda: float("inf"))
+            self.assertEqual(5, player.stats.depth)
+
+    def test_mcts_reuses_tree(self):
+        """The MCTS player must keep the subtree of the position it reaches"""
+        player = competition_agent.CustomPlayer(seed=0)
+        game = isolation.Board(player, self.player2)
+        game.apply_move((3, 3))
+        game.apply_move((0, 0))
+        calls = [500]
+
+        def time_left():
+            calls[0] -= 1
+            return calls[0]
+        move = player.get_move(game, time_left)
+        self.assertIn(move, game.get_legal_moves())
+        game.apply_move(move)
+        game.apply_move(game.get_legal_moves()[0])
+
+        move = player.get_move(game, lambda: 0.) # no time to search
+        self.assertGreater(player.visits[0], 1)
+        self.assertIn(move, game.get_legal_moves())
+
+    def test_opening_book_lookup(self):
+        """Book moves must be found in every symmetric variant of a position"""
+        records = opening_book.build_book(plies=1, search_depth=2)
+        handle, path = tempfile.mkstemp()
+        os.close(handle)
+        try:
+            opening_book.write_book(path, records)
+            book = opening_book.OpeningBook(path)
+            player = game_agent.AlphaBetaPlayer1(book=book)
+            for opening in [(0, 0), (6, 6), (0, 6), (6, 0)]:
+                game = isolation.Board(self.player1, player)
+                game.apply_move(opening)
+                move = player.get_move(game, lambda: 1e9)
+                self.assertIn(move, game.get_legal_moves())
+                self.assertEqual(0, player.stats.nodes)
+            book.close()
+        finally:
+            os.remove(path)
+
+    def test_opening_book_matches_search(self):
+        """Book records must be the results of fresh searches of their
+        positions"""
+        records = opening_book.build_book(plies=1, search_depth=3)
+        # the first variant of every symmetry class is the one the builder searches
+        openings = [None] + isolation.Board(self.player1, self.player2, shuffle=False).get_legal_moves()
+        keys = set()
+        for opening in openings:
+            player = game_agent.AlphaBetaPlayer1(search_depth=3, score_fn=sample_players.improved_score)
+            if opening is None:
+                game = isolation.Board(player, self.player2, shuffle=False)
+            else:
+                game = isolation.Board(self.player1, player, shuffle=False)
+                game.apply_move(opening)
+            key, symmetry = game.canonical_hash()
+            if key in keys:
+                continue
+            keys.add(key)
+            canonical = game.canonical_move(player.get_move(game, lambda: float("inf")), symmetry)
+            self.assertEqual((canonical[0] + canonical[1] * 7, player.depth, player.best_score), records[key])
+        self.assertEqual(keys, set(records))
+
+    def test_tablebase_matches_search(self):
+        """Tablebase values must match an exhaustive search of the position"""
+        def solve(game):
+            results = [solve(game.forecast_move(move)) for move in game.get_legal_moves()]
+            wins = [distance + 1 for wins, distance in results if not wins]
+            if wins:
+                return True, min(wins)
+            return False, max([distance + 1 for _, distance in results], default=0)
+
+        path = tempfile.mkdtemp()
+        try:
+            tablebase.generate(path, 3, 5, 5, workers=1)
+            table = tablebase.Tablebase(path, 5, 5)
+            rng = random.Random(0)
+            probed = 0
+            for _ in range(200):
+                game = isolation.Board(self.player1, self.player2, 5, 5)
+                while not game.is_loser(game.active_player):
+                    game.apply_move(rng.choice(game.get_legal_moves()))
+                    value = table.probe(game) if game.move_count > 2 else None
+                    if value is not None:
+                        self.assertEqual(solve(game), value)
+                        probed += 1
+            self.assertGreater(probed, 0)
+        finally:
+            shutil.rmtree(path)
+
 
 if __name__ == '__main__':
     unittest.main()
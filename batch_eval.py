@@ -0,0 +1,159 @@
+"""Vectorized evaluation of many isolation positions at once with NumPy.
+
+A batch of N positions of the same board size is described by
+
+    blocked : uint8 array of shape (N, width * height)
+        1 for the cells already visited by a player, 0 for blank cells, in
+        the cell order used by `isolation.Board` (idx = row + column * height)
+
+    own_loc, opp_loc : int arrays of shape (N,)
+        Cell index of the evaluated player and of its opponent, -1 if the
+        player has not been placed yet
+
+    own_to_move : bool array of shape (N,)
+        True where the evaluated player holds the initiative
+
+`batch_evaluate` computes the mobility of both players, the linear, quad and
+mixed mobility scores of game_agent.py and the squared distance to the center
+for every position in one pass. `boards_to_arrays` converts `Board` objects to
+this representation, `score_children` scores every successor of a position so
+a search can order or prune a whole frontier with a single call.
+"""
+import numpy as np
+
+from isolation import Board
+from isolation.isolation import get_move_map
+from game_agent import linear_score, quad_score, mixed_score
+
+# (width, height) -> padded neighbor matrix, see get_neighbor_matrix
+_neighbor_matrices = {}
+
+LINEAR_SCORE = np.array(linear_score)
+QUAD_SCORE = np.array(quad_score)
+MIXED_SCORE = np.array(mixed_score)
+
+
+def get_neighbor_matrix(width, height):
+    """Return an int array of shape (width * height + 1, 8) holding the knight
+    neighbors of every cell. Missing neighbors, and every neighbor of the
+    extra last row (used for unplaced players), point to the padding cell
+    width * height, which is always blocked.
+    """
+    matrix = _neighbor_matrices.get((width, height))
+    if matrix is None:
+        size = width * height
+        neighbors, _ = get_move_map(width, height)
+        matrix = np.full((size + 1, 8), size, dtype=np.intp)
+        for idx, cells in enumerate(neighbors):
+            matrix[idx, :len(cells)] = cells
+        _neighbor_matrices[(width, height)] = matrix
+    return matrix
+
+
+def boards_to_arrays(boards, player):
+    """Convert a sequence of boards of the same size to the arrays used by
+    `batch_evaluate`, from the point of view of the given player.
+
+    Returns
+    -------
+    (numpy.ndarray, numpy.ndarray, numpy.ndarray, numpy.ndarray)
+        blocked, own_loc, opp_loc and own_to_move for the boards
+    """
+    count = len(boards)
+    size = boards[0].width * boards[0].height
+    blocked = np.frombuffer(b''.join(bytes(board._board_state) for board in boards),
+                            dtype=np.uint8).reshape(count, size)
+    own_loc = np.empty(count, dtype=np.intp)
+    opp_loc = np.empty(count, dtype=np.intp)
+    own_to_move = np.empty(count, dtype=bool)
+    for i, board in enumerate(boards):
+        own = board._location_index(player)
+        opp = board._location_index(board.get_opponent(player))
+        own_loc[i] = -1 if own == Board.NOT_MOVED else own
+        opp_loc[i] = -1 if opp == Board.NOT_MOVED else opp
+        own_to_move[i] = board.active_player == player
+    return blocked, own_loc, opp_loc, own_to_move
+
+
+def batch_mobility(blocked, loc, width, height):
+    """Return the number of legal moves from the cell indices in loc for each
+    position, or the number of blank cells where loc is -1.
+    """
+    size = width * height
+    padded = np.ones((blocked.shape[0], size + 1), dtype=np.uint8)
+    padded[:, :size] = blocked
+    neighbors = get_neighbor_matrix(width, height)[np.where(loc < 0, size, loc)]
+    rows = np.arange(blocked.shape[0])[:, None]
+    moves = 8 - padded[rows, neighbors].sum(axis=1, dtype=np.intp)
+    return np.where(loc < 0, size - blocked.sum(axis=1, dtype=np.intp), moves)
+
+
+def batch_center_distance(loc, width, height):
+    """Return the squared distance to the center of the board for the cell
+    indices in loc, computed like `sample_players.center_score`. Unplaced
+    players (loc -1) get a distance of 0. Unlike center_score, which returns
+    -inf / +inf once the game is over, the distance is returned for
+    terminal positions too: use the mobility scores to detect them.
+    """
+    w, h = width / 2., height / 2.
+    y, x = loc % height, loc // height
+    return np.where(loc < 0, 0., (h - y) ** 2 + (w - x) ** 2)
+
+
+def batch_evaluate(blocked, own_loc, opp_loc, own_to_move, width=7, height=7):
+    """Evaluate a batch of positions in one pass.
+
+    Returns
+    -------
+    dict<str, numpy.ndarray>
+        own_moves and opp_moves, the number of legal moves of each player;
+        linear, quad and mixed, the mobility scores of game_agent.py set to
+        -inf / +inf where the evaluated player lost / won, like custom_score
+        and custom_score_2; center, the squared distance of the evaluated
+        player to the center, not replaced by -inf / +inf at terminal
+        positions (see batch_center_distance).
+    """
+    own_moves = batch_mobility(blocked, own_loc, width, height)
+    opp_moves = batch_mobility(blocked, opp_loc, width, height)
+
+    # unplaced players can have more than 8 moves, the score tables stop there
+    own_idx = np.minimum(own_moves, 8)
+    opp_idx = np.minimum(opp_moves, 8)
+    lost = own_to_move & (own_moves == 0)
+    won = ~own_to_move & (opp_moves == 0)
+
+    features = {"own_moves": own_moves, "opp_moves": opp_moves,
+                "center": batch_center_distance(own_loc, width, height)}
+    for name, table in (("linear", LINEAR_SCORE), ("quad", QUAD_SCORE), ("mixed", MIXED_SCORE)):
+        score = table[own_idx, opp_idx]
+        score[lost] = float("-inf")
+        score[won] = float("inf")
+        features[name] = score
+    return features
+
+
+def score_children(game, player, feature="mixed"):
+    """Score every successor of the position with a single batch evaluation.
+
+    Parameters
+    ----------
+    game : `isolation.Board`
+        The position to expand.
+
+    player : object
+        The player the scores are computed for.
+
+    feature : str (optional)
+        The key of `batch_evaluate` used as score.
+
+    Returns
+    -------
+    list<(float, (int, int))>
+        The score and the move of every legal move of the active player.
+    """
+    moves = game.get_legal_moves()
+    if not moves:
+        return []
+    children = [game.forecast_move(move) for move in moves]
+    features = batch_evaluate(*boards_to_arrays(children, player), width=game.width, height=game.height)
+    return list(zip(features[feature].tolist(), moves))
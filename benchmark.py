@@ -0,0 +1,268 @@
+"""Search benchmark: every player of game_agent.py and game_agent1.py on a
+fixed set of positions.
+
+tournament.py measures playing strength, which takes thousands of games.
+This benchmark measures the search itself, in seconds, and is deterministic:
+the positions are fixed move sequences, the boards don't shuffle the moves
+and every search starts with a new player. Each player searches each
+position twice:
+
+    depth : up to a fixed depth, measuring the time to depth
+    nodes : for a fixed number of nodes, measuring the depth reached
+
+Nodes are counted by the time_left function given to the player, which
+every player calls once per node, and the same function stops the search
+when the depth or the number of nodes is reached. The move, score, depth,
+nodes and time of every search are written to a JSON file, and compared to
+the results of a previous run to flag slowdowns; the command exits with
+status 1 on a regression:
+
+    python benchmark.py --output baseline.json
+    python benchmark.py --baseline baseline.json --output current.json
+"""
+import argparse
+import contextlib
+import gc
+import inspect
+import io
+import json
+import math
+import platform
+import sys
+import time
+
+from isolation import Board
+from isolation.endgame import clear_memo
+import perft
+import game_agent
+import game_agent1
+
+# placeholder for the opponent of the benchmarked player
+OPPONENT = "opponent"
+
+# name -> moves played from the empty 7x7 board
+POSITIONS = {
+    'midgame-1': [(4, 4), (5, 2), (6, 3), (3, 3), (5, 5), (1, 4), (3, 4), (2, 6), (4, 2), (4, 5)],
+    'midgame-2': [(5, 0), (0, 5), (6, 2), (2, 4), (4, 1), (1, 2), (6, 0), (3, 3), (5, 2), (4, 5)],
+    'midgame-3': [(4, 5), (3, 6), (5, 3), (4, 4), (3, 2), (2, 5), (1, 1), (3, 3), (0, 3), (1, 4)],
+    'midgame-4': [(0, 6), (2, 2), (2, 5), (4, 3), (4, 4), (2, 4), (5, 2), (3, 6), (6, 4), (5, 5), (4, 5), (6, 3),
+                  (6, 6), (4, 2), (5, 4), (3, 4)],
+    'midgame-5': [(6, 4), (3, 1), (4, 3), (1, 0), (3, 5), (0, 2), (5, 4), (2, 3), (4, 6), (1, 5), (2, 5), (0, 3),
+                  (0, 4), (1, 1), (1, 2), (3, 2)],
+    'endgame-1': [(3, 0), (4, 3), (1, 1), (6, 2), (2, 3), (5, 0), (4, 2), (3, 1), (2, 1), (5, 2), (0, 0), (4, 4),
+                  (1, 2), (5, 6), (2, 4), (6, 4), (3, 2), (4, 5), (2, 0), (5, 3), (0, 1), (3, 4), (2, 2), (2, 6)],
+    'endgame-2': [(1, 1), (0, 5), (3, 0), (1, 3), (5, 1), (3, 2), (6, 3), (4, 0), (4, 2), (2, 1), (5, 4), (3, 3),
+                  (6, 6), (5, 2), (4, 5), (3, 1), (2, 4), (5, 0), (0, 3), (6, 2), (1, 5), (4, 3), (2, 3), (3, 5)],
+    # partitioned: the players can't reach each other any more
+    'endgame-3': [(2, 1), (0, 0), (4, 0), (1, 2), (3, 2), (2, 4), (5, 3), (4, 3), (3, 4), (6, 4), (1, 5), (5, 2),
+                  (3, 6), (6, 0), (4, 4), (4, 1), (2, 3), (2, 0), (4, 2), (0, 1), (5, 4), (1, 3), (3, 5), (0, 5),
+                  (1, 6), (2, 6), (0, 4), (1, 4), (2, 5), (2, 2)],
+}
+
+# depth the players search to in the node limited runs, if they honor it
+UNLIMITED_DEPTH = 100
+
+
+def player_classes(modules=(game_agent, game_agent1)):
+    """Return {'module.Class': class} of every search player of the modules."""
+    players = {}
+    for module in modules:
+        for name, cls in inspect.getmembers(module, inspect.isclass):
+            if cls.__module__ == module.__name__ and issubclass(cls, module.IsolationPlayer) and \
+                    cls is not module.IsolationPlayer:
+                players["{}.{}".format(module.__name__, name)] = cls
+    return players
+
+
+def make_position(player, moves):
+    """Return the board reached by the moves with the player to move."""
+    if len(moves) % 2 == 0:
+        game = Board(player, OPPONENT, shuffle=False)
+    else:
+        game = Board(OPPONENT, player, shuffle=False)
+    for move in moves:
+        game.apply_move(move)
+    return game
+
+
+def completed_depth(player):
+    """Return the deepest iteration the player completed so far in its
+    current search."""
+    stats = getattr(player, 'stats', None)
+    if stats is not None:
+        return stats.depth
+    return max(0, player.depth - 1) # the iteration at player.depth is in progress
+
+
+class Budget:
+    """time_left function counting the nodes of a search and stopping it
+    (returning 0) once it exceeds max_nodes or completed max_depth."""
+
+    def __init__(self, player, max_depth=None, max_nodes=None):
+        self.player = player
+        self.max_depth = max_depth
+        self.max_nodes = max_nodes
+        self.nodes = 0
+        self.stopped_at = None
+
+    def __call__(self):
+        if self.stopped_at is not None:
+            return 0.
+        self.nodes += 1
+        if ((self.max_nodes is not None and self.nodes > self.max_nodes) or
+                (self.max_depth is not None and completed_depth(self.player) >= self.max_depth)):
+            self.stopped_at = completed_depth(self.player)
+            return 0.
+        return float("inf")
+
+
+def run_search(cls, moves, depth=None, nodes=None):
+    """Search a position with a new player and return the result dict."""
+    player = cls(search_depth=UNLIMITED_DEPTH if depth is None else depth)
+    game = make_position(player, moves)
+    budget = Budget(player, depth, nodes)
+    output = io.StringIO() # some players print while searching
+    clear_memo() # the endgame solver would remember the regions solved by earlier searches
+    gc.collect()
+    gc.disable() # like timeit, keep the collector from timing the garbage of earlier searches
+    try:
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(output):
+            move = player.get_move(game, budget)
+        seconds = time.perf_counter() - start
+    finally:
+        gc.enable()
+
+    if budget.stopped_at is not None:
+        reached = budget.stopped_at
+    elif hasattr(player, 'stats'):
+        reached = player.stats.depth
+    else:
+        reached = player.depth or player.search_depth # MinimaxPlayer doesn't iterate
+    score = getattr(player, 'best_score', None)
+    if score is not None and not math.isfinite(score):
+        score = None
+    return {
+        'move': list(move) if move else None,
+        'score': score,
+        'depth': reached,
+        'nodes': budget.nodes,
+        'seconds': seconds,
+    }
+
+
+def calibrate(repeat=3):
+    """Return the time in seconds of a fixed perft walk, the best of repeat
+    runs. Times are compared relative to it, which cancels out most of the
+    difference in speed between machines, or of one machine between runs."""
+    game = perft.make_position(Board, 7, 7, 0.)
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        perft.perft_apply(game, 4)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def run(players, positions=POSITIONS, depth=8, nodes=50000, repeat=3, out=sys.stdout):
+    """Run the benchmark and return {key: result}, the key being
+    'player/position/depth-N' or 'player/position/nodes-N'. The time of
+    every search is the best of repeat runs."""
+    results = {}
+    for player_name, cls in players.items():
+        for position, moves in positions.items():
+            for limit, kwargs in [("depth-{}".format(depth), {'depth': depth}),
+                                  ("nodes-{}".format(nodes), {'nodes': nodes})]:
+                result = run_search(cls, moves, **kwargs)
+                for _ in range(repeat - 1):
+                    result['seconds'] = min(result['seconds'], run_search(cls, moves, **kwargs)['seconds'])
+                key = "{}/{}/{}".format(player_name, position, limit)
+                results[key] = result
+                print("{:<62} {:>8} {:>3} {:>7} {:>9.4f}".format(
+                    key, str(tuple(result['move'] or ())), result['depth'], result['nodes'], result['seconds']),
+                    file=out, flush=True)
+    return results
+
+
+def compare(results, baseline, tolerance=.25, min_seconds=.02, scale=1.):
+    """Compare results to a baseline and return (regressions, slowdowns,
+    changes), three lists of messages.
+
+    A player is a regression if its total time over the searches of both
+    runs got slower by more than the tolerance, and a search to fixed depth
+    is one if it needs more nodes by more than the tolerance. Single
+    searches slower by more than the tolerance and by more than min_seconds
+    are only reported as slowdowns, the timer noise of short searches is
+    often larger than the tolerance. Different moves, scores or depths are
+    reported as changes: the benchmark is deterministic, so they mean that
+    the search itself changed.
+
+    The baseline times are multiplied by scale, the ratio of the
+    calibration times of the two runs.
+    """
+    regressions, slowdowns, changes = [], [], []
+    totals = {}
+    for key, result in sorted(results.items()):
+        base = baseline.get(key)
+        if base is None:
+            continue
+        base_seconds = base['seconds'] * scale
+        total = totals.setdefault(key.split('/')[0], [0., 0.])
+        total[0] += base_seconds
+        total[1] += result['seconds']
+        slower = result['seconds'] - base_seconds
+        if slower > min_seconds and result['seconds'] > base_seconds * (1 + tolerance):
+            slowdowns.append("{}: {:.4f}s -> {:.4f}s ({:+.0%})".format(
+                key, base_seconds, result['seconds'], slower / base_seconds))
+        if '/depth-' in key and result['nodes'] > base['nodes'] * (1 + tolerance):
+            regressions.append("{}: {} -> {} nodes".format(key, base['nodes'], result['nodes']))
+        for field in ('move', 'score', 'depth'):
+            if result[field] != base[field]:
+                changes.append("{}: {} {} -> {}".format(key, field, base[field], result[field]))
+    for player, (base, current) in sorted(totals.items()):
+        if base > 0 and current > base * (1 + tolerance):
+            regressions.append("{}: total {:.3f}s -> {:.3f}s ({:+.0%})".format(
+                player, base, current, current / base - 1))
+    return regressions, slowdowns, changes
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the search of the players on fixed positions.")
+    parser.add_argument('--player', action='append',
+                        help="only benchmark the players whose name contains this, repeat for several")
+    parser.add_argument('--depth', type=int, default=8, help="depth of the fixed depth searches")
+    parser.add_argument('--nodes', type=int, default=50000, help="nodes of the fixed node searches")
+    parser.add_argument('--repeat', type=int, default=3, help="keep the best time of this many runs")
+    parser.add_argument('--output', help="write the results to this JSON file")
+    parser.add_argument('--baseline', help="compare the results to this JSON file of a previous run")
+    parser.add_argument('--tolerance', type=float, default=.25, help="slowdown flagged as a regression")
+    args = parser.parse_args()
+
+    players = {name: cls for name, cls in player_classes().items()
+               if not args.player or any(part in name for part in args.player)}
+    calibration = calibrate()
+    results = run(players, depth=args.depth, nodes=args.nodes, repeat=args.repeat)
+    calibration = min(calibration, calibrate())
+    print("calibration: {:.4f}s".format(calibration))
+    if args.output:
+        with open(args.output, 'w') as output:
+            json.dump({'python': platform.python_version(), 'depth': args.depth, 'nodes': args.nodes,
+                       'calibration': calibration, 'results': results}, output, indent=1, sort_keys=True)
+    if args.baseline:
+        with open(args.baseline) as baseline_file:
+            baseline = json.load(baseline_file)
+        scale = calibration / baseline['calibration']
+        print("baseline times scaled by {:.2f}".format(scale))
+        regressions, slowdowns, changes = compare(results, baseline['results'], args.tolerance, scale=scale)
+        for message in changes:
+            print("changed:", message)
+        for message in slowdowns:
+            print("slower:", message)
+        for message in regressions:
+            print("REGRESSION:", message)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
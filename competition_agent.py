@@ -4,8 +4,12 @@ champions) in a tournament.
 
          COMPLETING AND SUBMITTING A COMPETITION AGENT IS OPTIONAL
 """
+import math
 import random
 
+from isolation.bitboard import _get_tables
+from game_agent import custom_score as mixed_score
+
 
 class SearchTimeout(Exception):
     """Subclass base exception for code clarity. """
@@ -33,16 +37,21 @@ def custom_score(game, player):
     float
         The heuristic value of the current game state to the specified player.
     """
-    raise NotImplementedError
+    return mixed_score(game, player)
 
 
 class CustomPlayer:
     """Game-playing agent to use in the optional player vs player Isolation
     competition.
 
-    You must at least implement the get_move() method and a search function
-    to complete this class, but you may use any of the techniques discussed
-    in lecture or elsewhere on the web -- opening books, MCTS, etc.
+    The agent runs Monte Carlo tree search with the UCT selection rule until
+    the time runs out and plays the most visited move. The tree lives in
+    flat arrays indexed by node number, the children of a node taking
+    consecutive numbers, and nodes don't store positions: the position of a
+    node is rebuilt by playing the moves of the path from the root on
+    integer bitmasks (see `isolation.BitBoard`), which is also the board the
+    rollouts are played on. After a move the subtree of the position the
+    opponent answered with is kept for the next search.
 
     **************************************************************************
           THIS CLASS IS OPTIONAL -- IT IS ONLY USED IN THE ISOLATION PvP
@@ -52,19 +61,51 @@ class CustomPlayer:
     Parameters
     ----------
     data : string
-        The name of the search method to use in get_move().
+        The rollout policy: "random" plays uniformly random moves, "greedy"
+        (the default) moves to the cell with the most onward moves.
 
     timeout : float (optional)
         Time remaining (in milliseconds) when search is aborted.  Note that
         the PvP competition uses more accurate timers that are not cross-
         platform compatible, so a limit of 1ms (vs 10ms for the other classes)
         is generally sufficient.
+
+    exploration : float (optional)
+        Exploration constant of the UCT formula.
+
+    max_nodes : int (optional)
+        Size of the node store. Leaves stop being expanded once it is full.
+
+    seed : hashable (optional)
+        Seed of the random generator of the rollouts.
     """
 
-    def __init__(self, data=None, timeout=1.):
+    def __init__(self, data=None, timeout=1., exploration=1.4, max_nodes=1 << 20, seed=None):
         self.score = custom_score
         self.time_left = None
         self.TIMER_THRESHOLD = timeout
+        self.greedy = data != "random"
+        self.exploration = exploration
+        self.max_nodes = max_nodes
+        self.random = random.Random(seed)
+        self.iterations = 0
+        self.reset_tree()
+
+        # (blocked cells, cell index of the chosen move) of the last search,
+        # to find the subtree of the next position
+        self._last = None
+
+    def reset_tree(self):
+        """Empty the node store, leaving only the root node. The node arrays
+        hold for every node the cell index of the move leading to it, the
+        number of its first child (-1 until expanded), its number of
+        children, its visit count and the wins of the player who moved into
+        it."""
+        self.moves = [-1]
+        self.first_child = [-1]
+        self.child_count = [0]
+        self.visits = [0]
+        self.wins = [0.]
 
     def get_move(self, game, time_left):
         """Search for the best move from the available legal moves and return a
@@ -93,5 +134,151 @@ class CustomPlayer:
             Board coordinates corresponding to a legal move; may return
             (-1, -1) if there are no available legal moves.
         """
-        # OPTIONAL: Finish this function!
-        raise NotImplementedError
+        self.time_left = time_left
+        knight, coords, full = _get_tables(game.width, game.height)
+        blocked = game._blocked_mask()
+        own = game._location_index(game.active_player)
+        opp = game._location_index(game.inactive_player)
+        own = -1 if own is None else own
+        opp = -1 if opp is None else opp
+        self.reuse_tree(blocked, own, opp)
+
+        # the first iteration expands the root if the tree was not reused
+        self.iterations = 0
+        while True:
+            self.iterate(blocked, own, opp, knight, full)
+            self.iterations += 1
+            if self.child_count[0] < 2 or time_left() <= self.TIMER_THRESHOLD:
+                break # no choice to make, or no time left
+
+        if self.child_count[0] == 0:
+            self._last = None
+            return -1, -1
+        first = self.first_child[0]
+        children = range(first, first + self.child_count[0])
+        best = max(children, key=self.visits.__getitem__)
+        self._last = blocked, self.moves[best]
+        return coords[self.moves[best]]
+
+    def reuse_tree(self, blocked, own, opp):
+        """Make the node of the position the root of the tree if the previous
+        search reached it (the previous root, the move this player chose and
+        the reply of the opponent), otherwise start a new tree."""
+        node = -1
+        if self._last is not None and own >= 0 and opp >= 0:
+            last_blocked, move = self._last
+            if own == move and blocked == last_blocked | (1 << own) | (1 << opp):
+                node = self._find_child(self._find_child(0, own), opp)
+        if node < 0:
+            self.reset_tree()
+            return
+
+        # copy the subtree breadth first, children keep consecutive numbers
+        moves, first_child, child_count = [self.moves[node]], [-1], [self.child_count[node]]
+        visits, wins = [self.visits[node]], [self.wins[node]]
+        queue = [(node, 0)]
+        for old, new in queue:
+            first = self.first_child[old]
+            if first < 0:
+                continue
+            first_child[new] = len(moves)
+            for child in range(first, first + self.child_count[old]):
+                queue.append((child, len(moves)))
+                moves.append(self.moves[child])
+                first_child.append(-1)
+                child_count.append(self.child_count[child])
+                visits.append(self.visits[child])
+                wins.append(self.wins[child])
+        self.moves, self.first_child, self.child_count = moves, first_child, child_count
+        self.visits, self.wins = visits, wins
+
+    def _find_child(self, node, move):
+        """Return the child of node reached by the move, or -1."""
+        if node < 0 or self.first_child[node] < 0:
+            return -1
+        first = self.first_child[node]
+        for child in range(first, first + self.child_count[node]):
+            if self.moves[child] == move:
+                return child
+        return -1
+
+    def iterate(self, blocked, own, opp, knight, full):
+        """Run one selection, expansion, rollout and backpropagation step from
+        the root position."""
+        moves, first_child, child_count = self.moves, self.first_child, self.child_count
+        visits, wins = self.visits, self.wins
+        exploration = self.exploration
+
+        # selection: play the UCT move until a leaf of the tree
+        node = 0
+        path = [0]
+        while first_child[node] >= 0 and child_count[node]:
+            first = first_child[node]
+            log_visits = math.log(visits[node])
+            best, best_value = -1, float("-inf")
+            for child in range(first, first + child_count[node]):
+                child_visits = visits[child]
+                if not child_visits:
+                    best = child
+                    break
+                value = wins[child] / child_visits + exploration * math.sqrt(log_visits / child_visits)
+                if value > best_value:
+                    best, best_value = child, value
+            node = best
+            blocked |= 1 << moves[node]
+            own, opp = opp, moves[node]
+            path.append(node)
+
+        # expansion: add every move of a leaf visited before, then pick one
+        if first_child[node] < 0 and (visits[node] or node == 0) and len(moves) < self.max_nodes:
+            mask = (knight[own] if own >= 0 else full) & ~blocked
+            first_child[node] = len(moves)
+            while mask:
+                low = mask & -mask
+                mask ^= low
+                moves.append(low.bit_length() - 1)
+                first_child.append(-1)
+                child_count.append(0)
+                visits.append(0)
+                wins.append(0.)
+            child_count[node] = len(moves) - first_child[node]
+            if child_count[node]:
+                node = first_child[node] + self.random.randrange(child_count[node])
+                blocked |= 1 << moves[node]
+                own, opp = opp, moves[node]
+                path.append(node)
+
+        # the node of path[i] was entered by the player to move at path[i-1]:
+        # the player to move at the leaf for odd distances to the leaf
+        leaf_wins = self.rollout(blocked, own, opp, knight, full)
+        leaf = len(path) - 1
+        for i, node in enumerate(path):
+            visits[node] += 1
+            if leaf_wins == ((leaf - i) % 2 == 1):
+                wins[node] += 1.
+
+    def rollout(self, blocked, own, opp, knight, full):
+        """Play the position out with the rollout policy and return True if
+        the player to move wins."""
+        rng = self.random
+        greedy = self.greedy
+        to_move_wins = False
+        while True:
+            mask = (knight[own] if own >= 0 else full) & ~blocked
+            if not mask:
+                return to_move_wins
+            cells = []
+            while mask:
+                low = mask & -mask
+                mask ^= low
+                cells.append(low.bit_length() - 1)
+            if greedy and own >= 0:
+                # most onward moves, ties broken at random
+                rng.shuffle(cells)
+                free = ~blocked
+                cell = max(cells, key=lambda target: bin(knight[target] & free).count("1"))
+            else:
+                cell = cells[rng.randrange(len(cells))]
+            blocked |= 1 << cell
+            own, opp = opp, cell
+            to_move_wins = not to_move_wins
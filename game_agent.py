@@ -2,15 +2,48 @@
 test your agent's strength against a set of known agents using tournament.py
 and include the results in your report.
 """
+import math
 import random
 #import timeit
 
+from transposition import TranspositionTable, EXACT, LOWER, UPPER
+from isolation.endgame import longest_path, clear_memo
+from time_manager import TimeManager
+from search_stats import SearchStats
+
 
 
 class SearchTimeout(Exception):
     """Subclass base exception for code clarity. """
     pass
 
+
+def endgame_move(player, game):
+    """Return the provably best move of a partitioned position, found by the
+    exact longest path solver of isolation.endgame, or None if the players
+    can still interfere with each other or the solver runs out of time (the
+    caller then falls back to its search). The solver gets half of the time
+    left for the move, the other half is kept for that search. The longest
+    paths memoized by the solver are kept while the game stays partitioned,
+    and freed as soon as the player searches a position that is not.
+    """
+    if not game.is_partitioned():
+        clear_memo() # solved for another game
+        return None
+
+    deadline = (player.time_left() + player.TIMER_THRESHOLD) / 2
+
+    def check_time():
+        if player.time_left() < deadline:
+            raise SearchTimeout()
+
+    try:
+        _, move = longest_path(game, game.active_player, check_time)
+    except SearchTimeout:
+        return None
+    player.solved = True
+    return move
+
 def get_linear_score (moves):
     """converts the number of moves a player has to a linear mobility score
     i.e if player has one move the score is 1, if player has two moves the score is 1+1/2, 3 moves 1+1/2+1/3, etc
@@ -66,8 +99,8 @@ def custom_score(game, player):
     if game.is_winner(player):
         return float("inf")
 
-    own_moves = len(game.get_legal_moves(player))
-    opp_moves = len(game.get_legal_moves(game.get_opponent(player)))
+    own_moves = game.count_moves(player)
+    opp_moves = game.count_moves(game.get_opponent(player))
 
     return mixed_score[own_moves][opp_moves]
 
@@ -100,8 +133,8 @@ def custom_score_2(game, player):
     if game.is_winner(player):
         return float("inf")
 
-    own_moves = len(game.get_legal_moves(player))
-    opp_moves = len(game.get_legal_moves(game.get_opponent(player)))
+    own_moves = game.count_moves(player)
+    opp_moves = game.count_moves(game.get_opponent(player))
 
     # if own_moves == 0 and opp_moves != 0:
     #    return float("-inf")
@@ -140,8 +173,8 @@ def custom_score_3(game, player):
     if game.is_winner(player):
         return float("inf")
 
-    own_moves = len(game.get_legal_moves(player))
-    opp_moves = len(game.get_legal_moves(game.get_opponent(player)))
+    own_moves = game.count_moves(player)
+    opp_moves = game.count_moves(game.get_opponent(player))
 
     # if own_moves == 0 and opp_moves!=0:
     #    print (own_moves, opp_moves, 'lost')
@@ -185,8 +218,8 @@ def custom_score_4(game, player):
         return float("inf")
         
         
-    own_moves = len(game.get_legal_moves(player))
-    opp_moves = len(game.get_legal_moves(game.get_opponent(player)))
+    own_moves = game.count_moves(player)
+    opp_moves = game.count_moves(game.get_opponent(player))
     return float(own_moves - opp_moves)
 
 
@@ -219,8 +252,8 @@ def custom_score_5(game, player):
     if game.is_winner(player):
         return float("inf")
 
-    own_moves = len(game.get_legal_moves(player))
-    #opp_moves = len(game.get_legal_moves(game.get_opponent(player)))
+    own_moves = game.count_moves(player)
+    #opp_moves = game.count_moves(game.get_opponent(player))
     return float(own_moves)
 
 #attmpt to estimate the number of moves available to a player until he runs out. Performs really badly in tests
@@ -275,7 +308,7 @@ def open_move_score(game, player):
     if game.is_winner(player):
         return float("inf")
 
-    return float(len(game.get_legal_moves(player)))
+    return float(game.count_moves(player))
 
 
 # function used to modify improved score coefficient
@@ -307,8 +340,8 @@ def custom_score_6(game, player, alpha=1):
     if game.is_winner(player):
         return float("inf")
 
-    own_moves = len(game.get_legal_moves(player))
-    opp_moves = len(game.get_legal_moves(game.get_opponent(player)))
+    own_moves = game.count_moves(player)
+    opp_moves = game.count_moves(game.get_opponent(player))
 
     return own_moves-alpha*opp_moves
 
@@ -379,6 +412,7 @@ class IsolationPlayer:
         self.best_map = {}
         self.opp_map = {}
         self.solved = False
+        self.stats = SearchStats()
 
 
 
@@ -419,6 +453,7 @@ class MinimaxPlayer(IsolationPlayer):
             (-1, -1) if there are no available legal moves.
         """
         self.time_left = time_left
+        self.stats.start()
 
         # Initialize the best move so that this function returns something
         # in case the search fails due to timeout
@@ -428,13 +463,13 @@ class MinimaxPlayer(IsolationPlayer):
             # The try/except block will automatically catch the exception
             # raised when the timer is about to expire.
             best_move = self.minimax(game, self.search_depth)
-
-            return best_move
+            self.stats.iteration_done(self.search_depth)
 
         except SearchTimeout:
-            pass  # Handle any actions required after timeout as needed
+            self.stats.timed_out = True  # Handle any actions required after timeout as needed
 
         # Return the best move from the last completed search iteration
+        self.stats.finish()
         return best_move
 
     def minimax(self, game, depth):
@@ -479,6 +514,7 @@ class MinimaxPlayer(IsolationPlayer):
         if self.time_left() < self.TIMER_THRESHOLD:
             raise SearchTimeout()
 
+        self.stats.nodes += 1
         best_score = float('-inf')
 
         actions = game.get_legal_moves()
@@ -503,7 +539,9 @@ class MinimaxPlayer(IsolationPlayer):
     def min_value(self, game, depth):
         if self.time_left() < self.TIMER_THRESHOLD:
             raise SearchTimeout()
+        self.stats.nodes += 1
         if depth == 0 or game.is_loser(self) or game.is_winner(self):
+            self.stats.leaves += 1
             score = self.score(game, self)
             if score == float('-inf'):  # adjust the score, so that going deeper down the tree is better
                                         # than losing right away
@@ -522,8 +560,10 @@ class MinimaxPlayer(IsolationPlayer):
     def max_value(self, game, depth):
         if self.time_left() < self.TIMER_THRESHOLD:
             raise SearchTimeout()
+        self.stats.nodes += 1
 
         if depth == 0 or game.is_loser(self) or game.is_winner(self):
+            self.stats.leaves += 1
             score = self.score(game, self)
             if score == float('-inf'):  # adjust the score, so that going deeper down the tree is better
                                         # than losing right away
@@ -552,20 +592,24 @@ class AlphaBetaPlayer(IsolationPlayer):
 
     def get_move(self, game, time_left):
         self.time_left = time_left
+        self.stats.start()
         best_move = (-1, -1)
-        for depth in range(1, len(game.get_blank_spaces())+1):
+        for depth in range(1, game.get_max_moves()+1):
             try:
                 # The try/except block will automatically catch the exception
                 # raised when the timer is about to expire.
                 #self.depth = depth
 
                 best_move = self.alphabeta(game, depth)
+                self.stats.iteration_done(depth)
             except SearchTimeout:
+                self.stats.timed_out = True
+                self.stats.finish()
                 return best_move  # Handle any actions required after timeout as needed
 
         # Return the best move from the last completed search iteration
 
-
+        self.stats.finish()
         return best_move
 
     def alphabeta(self, game, depth, alpha=float("-inf"), beta=float("inf")):
@@ -573,19 +617,20 @@ class AlphaBetaPlayer(IsolationPlayer):
         if self.time_left() < self.TIMER_THRESHOLD:
             raise SearchTimeout()
 
-
+        self.stats.nodes += 1
         actions = game.get_legal_moves()
         size = len(actions)
         if size == 0:
             return -1, -1
 
         best_score = float('-inf')
-        for action in actions:
+        for i, action in enumerate(actions):
             current_score = self.min_value(game.forecast_move(action), depth-1, alpha, beta, depth)
             if best_score < current_score or best_score==float('-inf'):
                 best = action
                 best_score = current_score
             if best_score >= beta:
+                self.stats.cutoff(i)
                 return best
             if alpha < best_score:
                     alpha = best_score
@@ -598,6 +643,7 @@ class AlphaBetaPlayer(IsolationPlayer):
         if self.time_left() < self.TIMER_THRESHOLD:
             raise SearchTimeout()
 
+        self.stats.nodes += 1
         actions = game.get_legal_moves()
         size = len(actions)
         #if self.depth == 0 or self.depth == depth: #This line might cause automated unit testing failure, but it is not an erroor
@@ -607,16 +653,19 @@ class AlphaBetaPlayer(IsolationPlayer):
                                                     # Default score. This way we chose moves that pospone loss as far down the road
                                                     #as possible and choose the winning moves from shallower positions
         if size == 0:
+            self.stats.leaves += 1
             return DEFAULT_SCORE
         if depth == 0:
+            self.stats.leaves += 1
             return self.default_score(game, DEFAULT_SCORE)
         best_score = DEFAULT_SCORE
 
-        for action in actions:
+        for i, action in enumerate(actions):
             current_score = self.max_value(game.forecast_move(action), depth-1, alpha, beta, max_depth)
             if best_score > current_score:
                 best_score = current_score
             if best_score <= alpha:
+                self.stats.cutoff(i)
                 return best_score
             if beta > best_score:
                     beta = best_score
@@ -632,6 +681,7 @@ class AlphaBetaPlayer(IsolationPlayer):
                                                     # maximum depth of current iterative deepening phase
         #    print (self.depth, depth)
 
+        self.stats.nodes += 1
         actions = game.get_legal_moves()
         size = len(actions)
         DEFAULT_SCORE = - 10e18 / (max_depth - depth) # the deeper we proceed down the tree the smaller the absolute magnitude of
@@ -639,16 +689,19 @@ class AlphaBetaPlayer(IsolationPlayer):
                                                     # as possible and choose the winning moves from shallower positions. This might lead
                                                     # to automated error testing, but it is not an error!!!
         if size == 0:
+            self.stats.leaves += 1
             return DEFAULT_SCORE
         if depth == 0:
+            self.stats.leaves += 1
             return self.default_score(game,DEFAULT_SCORE)
 
         best_score = DEFAULT_SCORE
-        for action in actions:
+        for i, action in enumerate(actions):
             current_score = self.min_value(game.forecast_move(action), depth-1, alpha, beta, max_depth)
             if best_score < current_score:
                 best_score = current_score
                 if best_score >= beta:
+                    self.stats.cutoff(i)
                     return best_score
                 if alpha < best_score:
                     alpha = best_score
@@ -666,31 +719,99 @@ class AlphaBetaPlayer(IsolationPlayer):
 #the most optimized version of alphabetaplayer (it does not pass the interface test as it uses modifications in isolation.py)
 #available optimizations:
 #1) move ordering
-#2) iterative deepening result caching
-#3) apply_move reverse_move pattern instead of copying position with forecast_move speeding the program up and also saving memory
+#2) iterative deepening result caching in a bounded transposition table that is kept between moves
+#3) apply_move undo_move pattern instead of copying position with forecast_move speeding the program up and also saving memory
 class AlphaBetaPlayer1(IsolationPlayer):
     """Game-playing agent that chooses a move using iterative deepening minimax
     search with alpha-beta pruning. Use the same boards for min and max functions and revert it to the previous state
     instead of copying the whole thing
+
+    Parameters
+    ----------
+    tt_size : int (optional)
+        Number of buckets of the transposition table shared by all the
+        searches of the player. Its scores are for the player to move, so
+        the entries stay right when the player changes seats between games.
+
+    aspiration_window : float (optional)
+        Half width of the window around the score of the previous iterative
+        deepening iteration used to search the next one. None searches every
+        iteration with the full window.
+
+    aspiration_growth : float (optional)
+        Factor applied to the half width of the window each time the search
+        falls outside of it.
+
+    book : `opening_book.OpeningBook` (optional)
+        Opening book consulted before searching.
+
+    tablebase : `tablebase.Tablebase` (optional)
+        Endgame tablebase giving the exact value of the leaves with small
+        open regions.
     """
     counter = 0
     WIN_SCORE = 1000 # if either player is able to score this means the position is won
+    KILLER_BONUS = 1 << 30 # killer moves are searched before any move ordered by the history table
+
+    def __init__(self, search_depth=3, score_fn=custom_score, timeout=30., tt_size=1 << 16,
+                 aspiration_window=1., aspiration_growth=4., book=None, tablebase=None):
+        super().__init__(search_depth=search_depth, score_fn=score_fn, timeout=timeout)
+        self.book = book
+        self.tablebase = tablebase
+        self.tt = TranspositionTable(tt_size)
+        self.best_score = float('-inf')
+        self.aspiration_window = aspiration_window
+        self.aspiration_growth = aspiration_growth
+        self.killers = []
+        self.history = []
+        self.time_manager = TimeManager()
 
     def get_move(self, game, time_left):
+        self.stats.start()
+        try:
+            return self.search(game, time_left)
+        finally:
+            self.stats.finish()
+
+    def search(self, game, time_left):
+        """Search the best move of the position for get_move, which wraps it
+        to collect the statistics of the move in self.stats."""
         self.time_left = time_left
+        self.tt.new_search()
+        self.start_move_ordering(game)
+
+        legal_moves = game.get_legal_moves()
+        if len(legal_moves) == 1:
+            return legal_moves[0] # forced move, nothing to search
+        if self.book is not None:
+            best_move = self.book.lookup(game)
+            if best_move in legal_moves:
+                return best_move
+        best_move = endgame_move(self, game)
+        if best_move is not None:
+            return best_move
+        self.time_manager.start(time_left, self.TIMER_THRESHOLD, len(legal_moves))
 
-        best_move = (-1, -1)
+        best_move = legal_moves[0] if legal_moves else (-1, -1) # anything but forfeiting if depth 1 times out
         for depth in range(1, self.search_depth +1):
+            if depth > 1 and not self.time_manager.can_start_iteration():
+                break # the iteration is not expected to finish in time
             try:
                 # The try/except block will automatically catch the exception
                 # raised when the timer is about to expire.
                 self.depth = depth
 
-                best_move = self.alphabeta(game, depth)
+                if depth == 1:
+                    best_move = self.alphabeta(game, depth)
+                else:
+                    best_move = self.aspiration_search(game, depth)
+                self.stats.iteration_done(depth)
                 if self.solved:
                     break
+                self.time_manager.iteration_done(best_move, self.stats.nodes)
             except SearchTimeout:
                 #print(depth,'timeout')
+                self.stats.timed_out = True
                 return best_move  # Handle any actions required after timeout as needed
 
         # Return the best move from the last completed search iteration
@@ -698,6 +819,73 @@ class AlphaBetaPlayer1(IsolationPlayer):
 
         return best_move
 
+    def start_move_ordering(self, game):
+        """Reset the killer moves and age the history table at the beginning
+        of a move. The history table has an entry for every (initiative,
+        from cell, to cell) triple."""
+        cells = game.width * game.height
+        self.killers = [[None, None] for _ in range(cells + 1)]
+        if len(self.history) != 2 * cells * cells:
+            self.history = [0] * (2 * cells * cells)
+        else:
+            self.history = [score >> 1 for score in self.history]
+
+    def order_by_history(self, actions, game, check, ply):
+        """Sort the moves of a position without transposition table entry:
+        killer moves of the same ply first, then by history score"""
+        p1, p2, init = check
+        origin = p2 if init else p1
+        if origin is None:
+            return # opening placement, no history for it
+        cells = game.width * game.height
+        if len(self.killers) != cells + 1: # searching without get_move
+            self.start_move_ordering(game)
+        base = (init * cells + origin) * cells
+        height = game.height
+        history = self.history
+        killers = self.killers[ply]
+        bonus = self.KILLER_BONUS
+        actions.sort(key=lambda move: history[base + move[0] + move[1] * height] + (bonus if move in killers else 0),
+                     reverse=True)
+
+    def record_cutoff(self, move, game, check, depth, ply):
+        """Remember a move that caused a cutoff as killer of its ply and raise
+        its history score"""
+        cells = game.width * game.height
+        if len(self.killers) != cells + 1: # searching without get_move
+            self.start_move_ordering(game)
+        killers = self.killers[ply]
+        if killers[0] != move:
+            killers[0], killers[1] = move, killers[0]
+        p1, p2, init = check
+        origin = p2 if init else p1
+        if origin is not None:
+            self.history[(init * cells + origin) * cells + move[0] + move[1] * game.height] += depth * depth
+
+    def aspiration_search(self, game, depth):
+        """Search with a narrow window around the score of the previous
+        iteration (self.best_score), widening the side that fails until the
+        score falls inside the window"""
+        previous = self.best_score
+        if self.aspiration_window is None or previous > self.WIN_SCORE or previous < -self.WIN_SCORE:
+            return self.alphabeta(game, depth) # won or lost positions are scored by distance, not around the previous score
+        low_width = high_width = self.aspiration_window
+        alpha, beta = previous - low_width, previous + high_width
+        while True:
+            best_move = self.alphabeta(game, depth, alpha, beta)
+            if self.best_score <= alpha:
+                low_width *= self.aspiration_growth
+                alpha = previous - low_width
+                if self.best_score < -self.WIN_SCORE or alpha < -self.WIN_SCORE: # the window can't reach a loss score
+                    alpha = float('-inf')
+            elif self.best_score >= beta:
+                high_width *= self.aspiration_growth
+                beta = previous + high_width
+                if self.best_score > self.WIN_SCORE or beta > self.WIN_SCORE: # the window can't reach a win score
+                    beta = float('inf')
+            else:
+                return best_move
+
     def alphabeta(self, game, depth, alpha=float("-inf"), beta=float("inf")):
 
         if self.time_left() < self.TIMER_THRESHOLD:
@@ -711,59 +899,47 @@ class AlphaBetaPlayer1(IsolationPlayer):
             self.solved = True
             return -1, -1
 
+        stats = self.stats
+        stats.nodes += 1
         location = game.hash()
-        action_list = self.best_map.get(location)
-        if action_list is None:
-            self.best_map = {} # empty map
-            plr2,plr1, init = game.check() # get positions for player 2, player 1 and initiative
-            saved_depth = 0
-            saved_score = float('-inf')
+        check = game.check() # positions for player 1, player 2 and initiative to reject hash collisions
+        entry = self.tt.probe(location, check)
+        stats.tt_probes += 1
+        if entry is not None:
+            stats.tt_hits += 1
+            _, _, saved_depth, flag, saved_score, saved_move, _ = entry
+            if saved_depth >= depth and flag == EXACT: # used cache results if available
+                saved_score = self.score_from_tt(saved_score, 0)
+                self.best_score = saved_score
+                self.solved = saved_score > self.WIN_SCORE or saved_score < -self.WIN_SCORE
+                return saved_move
+            self.order_moves(actions, saved_move)
         else:
-            saved_score, actions, saved_depth, (plr2, plr1, init) = action_list # used cache results if available
-            if (plr2, plr1, init) != game.check(): # check that caching was correct
-                print ("wrong position!!! at depth", 0)
-                return (-1,-1)
-
+            self.order_by_history(actions, game, check, 0)
 
+        alpha_orig = alpha
         best_score = float('-inf')
-        best_score_index = 0
-        if saved_depth < depth:
-            #gamecpy = game.copy() # we need to insure that the main board is not modified by apply_move reverse_move pattern
-            #during timeout that's why copy here is needed if we were to use it, but it is quicker to use #apply move at this level
-            for i in range(size):
-                current_score = self.min_value(game.forecast_move(actions[i]), depth-1, alpha, beta)
-                #gamecpy.reverse_move(saved_loc, actions[i]) # see previous comment
-                saved_depth = depth
-                if best_score < current_score:
-                    best = actions[i]
-                    best_score = current_score
-                    best_score_index = i
-                if best_score >= beta:
-                    if best_score > self.WIN_SCORE or best_score < -self.WIN_SCORE:
-                        self.solved = True # set solved to true to prevent further expansion with deeper level
-
-                    #sort scores from
-                    if best_score_index != 0:
-                        actions[0], actions[best_score_index] = actions[best_score_index], actions[0]
-
-                    self.best_map[location] = best_score, actions, saved_depth, (plr2, plr1, init)
-                    return best
-                if alpha < best_score:
-                    alpha = best_score
-        else:
-            return actions[0]
-
-        #print (best_score, best)
-        #print (scores, depths, actions, 'after')
+        best = actions[0]
+        #gamecpy = game.copy() # we need to insure that the main board is not modified by apply_move undo_move pattern
+        #during timeout that's why copy here is needed if we were to use it, but it is quicker to use #apply move at this level
+        for i, action in enumerate(actions):
+            current_score = self.min_value(game.forecast_move(action), depth-1, alpha, beta)
+            if best_score < current_score:
+                best = action
+                best_score = current_score
+            if best_score >= beta:
+                stats.cutoff(i)
+                self.record_cutoff(best, game, check, depth, 0)
+                break
+            if alpha < best_score:
+                alpha = best_score
 
         if best_score > self.WIN_SCORE or best_score < -self.WIN_SCORE:
             #print ('solved', best_score, best)
             self.solved = True  # set solved to true to prevent further expansion with deeper level
-        #sort scores in scores, depths, actions, save them in best_map[location]
-        if best_score_index != 0:
-            actions[0], actions[best_score_index] = actions[best_score_index], actions[0]
-        self.best_map[location] = best_score, actions, saved_depth, (plr2, plr1, init)
-        #print (self.best_map.get(location), 'after')
+        self.best_score = best_score
+        self.tt.store(location, check, depth, self.bound_flag(best_score, alpha_orig, beta),
+                      self.score_to_tt(best_score, 0), best)
         return best
 
 
@@ -772,59 +948,57 @@ class AlphaBetaPlayer1(IsolationPlayer):
             # print ('timed out in min value',self.time_left())
             raise SearchTimeout()
 
-        actions = game.get_legal_moves()
-        size = len(actions)
+        stats = self.stats
+        stats.nodes += 1
         DEFAULT_SCORE = 10e18 / (self.depth-depth)
-        if size == 0:
-            return DEFAULT_SCORE
         if depth == 0:
+            stats.leaves += 1
+            if not game.count_moves():
+                return DEFAULT_SCORE
+            if self.tablebase is not None:
+                score = self.tablebase_score(game, self.depth - depth)
+                if score is not None:
+                    return -score
             return self.default_score(game, DEFAULT_SCORE)
+        actions = game.get_legal_moves()
+        if len(actions) == 0:
+            stats.leaves += 1
+            return DEFAULT_SCORE
+
         location = game.hash()
-        action_list = self.opp_map.get(location)
-        if action_list is None:
-            if self.depth-depth ==1:
-                self.opp_map = {} #empty opponent map if at 1st level in the search tree
-            plr2, plr1, init = game.check()
-            saved_depth = 0
-            saved_score = DEFAULT_SCORE
+        check = game.check()
+        entry = self.tt.probe(location, check)
+        stats.tt_probes += 1
+        if entry is not None:
+            stats.tt_hits += 1
+            _, _, saved_depth, flag, saved_score, saved_move, _ = entry
+            # the entry is scored for the player to move, the opponent: its lower bound is an upper bound here
+            saved_score = -self.score_from_tt(saved_score, self.depth - depth)
+            if saved_depth >= depth and (flag == EXACT or (flag == UPPER and saved_score >= beta) or
+                                         (flag == LOWER and saved_score <= alpha)):
+                return saved_score
+            self.order_moves(actions, saved_move)
         else:
-            saved_score, actions, saved_depth, (plr2,plr1, init) = action_list
-            if (plr2, plr1, init) != game.check():
-                print ("wrong position!!! at depth", (self.depth-depth))
-                return DEFAULT_SCORE
+            self.order_by_history(actions, game, check, self.depth - depth)
+
+        alpha_orig, beta_orig = alpha, beta
         best_score = DEFAULT_SCORE
-        #print (depths, depth, depths[0]< depth)
-        best_score_index = 0
-        if saved_depth < depth:
-            saved_loc = game.get_player_location(game.active_player)
-
-            for i in range(len(actions)):
-                #print (game.to_string(), 'apply move min value', actions[i], depth)
-                current_score = self.max_value(game.apply_move(actions[i]), depth-1, alpha, beta)
-                #print (game.to_string(), " before move_reversed min value", saved_loc)
-                game.reverse_move(saved_loc, actions[i])
-                #print (game.to_string(), " reversed min value")
-                saved_depth = depth
-                if best_score > current_score:
-                    best_score = current_score
-                    best_score_index = i
-                if best_score <= alpha:
-                    #sort scores from
-                    if best_score_index!= 0:
-                        actions[0], actions[best_score_index] = actions[best_score_index], actions[0]
-                    self.opp_map[location] = best_score, actions, saved_depth, (plr2,plr1, init)
-                    return best_score
-                if beta > best_score:
-                    beta = best_score
-        else:
-            return saved_score
+        best = actions[0]
+        for i, action in enumerate(actions):
+            current_score = self.max_value(game.apply_move(action), depth-1, alpha, beta)
+            game.undo_move()
+            if best_score > current_score:
+                best_score = current_score
+                best = action
+            if best_score <= alpha:
+                stats.cutoff(i)
+                self.record_cutoff(best, game, check, depth, self.depth - depth)
+                break
+            if beta > best_score:
+                beta = best_score
 
-        if best_score > self.WIN_SCORE or best_score < -self.WIN_SCORE:
-            self.solved = True  # set solved to true to prevent further expansion with deeper level
-        #sort scores in scores, depths, actions, save them in best_map[location]
-        if best_score_index != 0:
-            actions[0], actions[best_score_index] = actions[best_score_index], actions[0]
-        self.opp_map[location] = best_score, actions, saved_depth, (plr2, plr1, init)
+        self.tt.store(location, check, depth, self.bound_flag(-best_score, -beta_orig, -alpha_orig),
+                      self.score_to_tt(-best_score, self.depth - depth), best)
         return best_score
 
     def max_value(self, game, depth, alpha, beta):
@@ -832,55 +1006,110 @@ class AlphaBetaPlayer1(IsolationPlayer):
             # print ('timed out in max value', self.time_left())
             raise SearchTimeout()
 
-        actions = game.get_legal_moves()
-        size = len(actions)
+        stats = self.stats
+        stats.nodes += 1
         DEFAULT_SCORE = - 10e18 / (self.depth- depth)
-        if size == 0:
-            return DEFAULT_SCORE
         if depth == 0:
+            stats.leaves += 1
+            if not game.count_moves():
+                return DEFAULT_SCORE
+            if self.tablebase is not None:
+                score = self.tablebase_score(game, self.depth - depth)
+                if score is not None:
+                    return score
             return self.default_score(game,DEFAULT_SCORE)
-
+        actions = game.get_legal_moves()
+        if len(actions) == 0:
+            stats.leaves += 1
+            return DEFAULT_SCORE
 
         location = game.hash()
-        action_list = self.best_map.get(location)
-        if action_list is None:
-            plr2,plr1,init = game.check()
-            saved_depth = 0
-            saved_score = DEFAULT_SCORE
-
+        check = game.check()
+        entry = self.tt.probe(location, check)
+        stats.tt_probes += 1
+        if entry is not None:
+            stats.tt_hits += 1
+            _, _, saved_depth, flag, saved_score, saved_move, _ = entry
+            saved_score = self.score_from_tt(saved_score, self.depth - depth)
+            if saved_depth >= depth and (flag == EXACT or (flag == LOWER and saved_score >= beta) or
+                                         (flag == UPPER and saved_score <= alpha)):
+                return saved_score
+            self.order_moves(actions, saved_move)
         else:
-            saved_score, actions, saved_depth, (plr2,plr1,init) = action_list
-            if (plr2, plr1, init) != game.check():
-                print ("wrong position!!! at depth", (self.depth-depth))
-                return DEFAULT_SCORE
+            self.order_by_history(actions, game, check, self.depth - depth)
+
+        alpha_orig, beta_orig = alpha, beta
         best_score = DEFAULT_SCORE
-        best_score_index = 0
-        if saved_depth < depth:
-            saved_loc = game.get_player_location(game.active_player)
-            for i in range(len(actions)):
-                #print (game.to_string(), 'apply move max value', actions[i], depth)
-                current_score = self.min_value(game.apply_move(actions[i]), depth-1, alpha, beta)
-                #print (game.to_string(), 'before reverse max value', saved_loc)
-                game.reverse_move(saved_loc, actions[i])
-                #print (game.to_string(), 'after reverse max value')
-                saved_depth = depth
-                if best_score < current_score:
-                    best_score = current_score
-                    best_score_index = i
-                if best_score >= beta:
-                    if best_score_index != 0:
-                        actions[0], actions[best_score_index] = actions[best_score_index], actions[0]
-                    self.best_map[location] = best_score, actions, saved_depth, (plr2,plr1,init)
-                    return best_score
-                if alpha < best_score:
-                    alpha = best_score
-        else:
-            return saved_score
-        if best_score_index != 0:
-            actions[0], actions[best_score_index] = actions[best_score_index], actions[0]
-        self.best_map[location] = best_score, actions, saved_depth, (plr2,plr1, init)
+        best = actions[0]
+        for i, action in enumerate(actions):
+            current_score = self.min_value(game.apply_move(action), depth-1, alpha, beta)
+            game.undo_move()
+            if best_score < current_score:
+                best_score = current_score
+                best = action
+            if best_score >= beta:
+                stats.cutoff(i)
+                self.record_cutoff(best, game, check, depth, self.depth - depth)
+                break
+            if alpha < best_score:
+                alpha = best_score
+
+        self.tt.store(location, check, depth, self.bound_flag(best_score, alpha_orig, beta_orig),
+                      self.score_to_tt(best_score, self.depth - depth), best)
         return best_score
 
+    @staticmethod
+    def order_moves(actions, best):
+        """Move the best move of a previous search to the front of actions"""
+        for i in range(1, len(actions)):
+            if actions[i] == best:
+                actions[0], actions[i] = actions[i], actions[0]
+                return
+
+    @staticmethod
+    def bound_flag(score, alpha, beta):
+        """Return the transposition table flag of a score searched with the
+        (alpha, beta) window"""
+        if score <= alpha:
+            return UPPER
+        if score >= beta:
+            return LOWER
+        return EXACT
+
+    @classmethod
+    def score_to_tt(cls, score, ply):
+        """Convert a score of the node at the given ply (distance from the
+        root) to the score stored in the transposition table. Win and loss
+        scores, 10e18 / (ply of the end of the game), are made relative to
+        the node, so that the entry stays right when the position is reached
+        again at another distance from the root, on a later move or in a
+        deeper iteration."""
+        if score > cls.WIN_SCORE or score < -cls.WIN_SCORE:
+            end = round(10e18 / abs(score))
+            return math.copysign(10e18 / (end - ply), score)
+        return score
+
+    @classmethod
+    def score_from_tt(cls, score, ply):
+        """Convert a score read from the transposition table to the score of
+        the node at the given ply, the inverse of score_to_tt."""
+        if score > cls.WIN_SCORE or score < -cls.WIN_SCORE:
+            end = round(10e18 / abs(score))
+            return math.copysign(10e18 / (end + ply), score)
+        return score
+
+    def tablebase_score(self, game, ply):
+        """Return the exact score of a leaf found in the tablebase, from the
+        point of view of the player to move, on the scale of DEFAULT_SCORE
+        (the sooner the loser gets stuck, the larger the score), or None if
+        the position is not in the tablebase."""
+        value = self.tablebase.probe(game)
+        if value is None:
+            return None
+        wins, distance = value
+        score = 10e18 / (ply + distance)
+        return score if wins else -score
+
     def default_score(self, game, DEFAULT_SCORE):
         score = self.score(game, self)
         if score == float('-inf'):  # adjust the score, so that going deeper down the tree is better
@@ -889,3 +1118,157 @@ class AlphaBetaPlayer1(IsolationPlayer):
         elif score == float('inf'):  # also winning right away is better than postponing it by several moves
             score = -DEFAULT_SCORE
         return score
+
+
+
+# principal variation search (negascout): negamax formulation of alpha beta where only the first move of every node
+# (the best move from the transposition table) is searched with the full window, and the remaining moves with a null
+# window that only proves they are not better. A move that fails high is searched again, with a window from the score
+# it got to beta
+class PVSPlayer(AlphaBetaPlayer1):
+    """Game-playing agent that chooses a move using iterative deepening
+    principal variation search. Everything but the search of an iteration
+    comes from `AlphaBetaPlayer1`: the transposition table, the aspiration
+    windows, the killer and history move ordering, the time management, the
+    opening book and the endgame solver and tablebase. The null window
+    searches only pay off with good move ordering.
+
+    Scores inside the search are negamax scores, from the point of view of the
+    player to move. The score of the root is the same as the one of
+    `AlphaBetaPlayer1`.
+    """
+
+    def alphabeta(self, game, depth, alpha=float("-inf"), beta=float("inf")):
+        """Search the root of one iteration, see `AlphaBetaPlayer1.alphabeta`.
+        The root moves are searched on copies of the board, so a timeout
+        leaves the board of the game untouched."""
+        if self.time_left() < self.TIMER_THRESHOLD:
+            raise SearchTimeout()
+
+        self.solved = False
+        actions = game.get_legal_moves()
+        if not actions:
+            self.solved = True
+            return -1, -1
+
+        stats = self.stats
+        stats.nodes += 1
+        location = game.hash()
+        check = game.check()
+        entry = self.tt.probe(location, check)
+        stats.tt_probes += 1
+        if entry is not None:
+            stats.tt_hits += 1
+            _, _, saved_depth, flag, saved_score, saved_move, _ = entry
+            if saved_depth >= depth and flag == EXACT:
+                self.best_score = self.score_from_tt(saved_score, 0)
+                self.solved = self.best_score > self.WIN_SCORE or self.best_score < -self.WIN_SCORE
+                return saved_move
+            self.order_moves(actions, saved_move)
+        else:
+            self.order_by_history(actions, game, check, 0)
+
+        alpha_orig = alpha
+        best_score = float('-inf')
+        best = actions[0]
+        for i, action in enumerate(actions):
+            child = game.forecast_move(action)
+            if i == 0:
+                current_score = -self.pvs(child, depth - 1, -beta, -alpha, 1)
+            else:
+                current_score = -self.pvs(child, depth - 1, -next_score(alpha), -alpha, 1)
+                if alpha < current_score < beta:
+                    current_score = -self.pvs(child, depth - 1, -beta, -current_score, 1)
+            if best_score < current_score:
+                best = action
+                best_score = current_score
+            if best_score >= beta:
+                stats.cutoff(i)
+                self.record_cutoff(best, game, check, depth, 0)
+                break
+            if alpha < best_score:
+                alpha = best_score
+
+        self.solved = best_score > self.WIN_SCORE or best_score < -self.WIN_SCORE
+        self.best_score = best_score
+        self.tt.store(location, check, depth, self.bound_flag(best_score, alpha_orig, beta),
+                      self.score_to_tt(best_score, 0), best)
+        return best
+
+    def pvs(self, game, depth, alpha, beta, ply):
+        if self.time_left() < self.TIMER_THRESHOLD:
+            raise SearchTimeout()
+
+        stats = self.stats
+        stats.nodes += 1
+        DEFAULT_SCORE = -10e18 / ply # the player to move lost, later losses score better than sooner ones
+        if depth == 0:
+            stats.leaves += 1
+            if not game.count_moves():
+                return DEFAULT_SCORE
+            if self.tablebase is not None:
+                score = self.tablebase_score(game, ply)
+                if score is not None:
+                    return score
+            return self.evaluate(game, DEFAULT_SCORE)
+        actions = game.get_legal_moves()
+        if not actions:
+            stats.leaves += 1
+            return DEFAULT_SCORE
+
+        location = game.hash()
+        check = game.check()
+        entry = self.tt.probe(location, check)
+        stats.tt_probes += 1
+        if entry is not None:
+            stats.tt_hits += 1
+            _, _, saved_depth, flag, saved_score, saved_move, _ = entry
+            saved_score = self.score_from_tt(saved_score, ply)
+            if saved_depth >= depth and (flag == EXACT or (flag == LOWER and saved_score >= beta) or
+                                         (flag == UPPER and saved_score <= alpha)):
+                return saved_score
+            self.order_moves(actions, saved_move)
+        else:
+            self.order_by_history(actions, game, check, ply)
+
+        alpha_orig = alpha
+        best_score = DEFAULT_SCORE
+        best = actions[0]
+        for i, action in enumerate(actions):
+            game.apply_move(action)
+            if i == 0:
+                current_score = -self.pvs(game, depth - 1, -beta, -alpha, ply + 1)
+            else:
+                # null window: only proves that the move is not better than the best one so far
+                current_score = -self.pvs(game, depth - 1, -next_score(alpha), -alpha, ply + 1)
+                if alpha < current_score < beta:
+                    current_score = -self.pvs(game, depth - 1, -beta, -current_score, ply + 1)
+            game.undo_move()
+            if best_score < current_score:
+                best_score = current_score
+                best = action
+            if best_score >= beta:
+                stats.cutoff(i)
+                self.record_cutoff(best, game, check, depth, ply)
+                break
+            if alpha < best_score:
+                alpha = best_score
+
+        self.tt.store(location, check, depth, self.bound_flag(best_score, alpha_orig, beta),
+                      self.score_to_tt(best_score, ply), best)
+        return best_score
+
+    def evaluate(self, game, DEFAULT_SCORE):
+        """Heuristic score of the position for the player to move"""
+        score = self.score(game, self)
+        if score == float('-inf'):  # losing later is better than losing right away
+            score = DEFAULT_SCORE
+        elif score == float('inf'):  # winning right away is better than postponing it
+            score = -DEFAULT_SCORE
+        return score if game.active_player == self else -score
+
+
+def next_score(score):
+    """Return the smallest float larger than score, the upper end of a null
+    window starting at score"""
+    return math.nextafter(score, float('inf'))
@@ -0,0 +1,380 @@
+"""
+This file contains the `BitBoard` class, an alternative core for the game
+Isolation that stores the blocked cells and the player positions as integer
+bitmasks instead of a Python list.
+
+Cells are numbered exactly like in `Board` (idx = row + column * height), so
+bit `idx` of the mask corresponds to `Board._board_state[idx]`. Knight attack
+masks are precomputed once per board size, which turns mobility counting and
+the terminal test into a handful of integer operations, and the move lists
+are cached by mask of open cells.
+
+`BitBoard` is not much faster than `Board` at walking the game tree: since
+`Board` keeps precomputed move maps and incremental move counts, both spend
+most of their time in apply_move, undo_move and the Python calls around them.
+It exists for the code that works on whole regions as masks, the flood fill
+of `get_region`, the endgame solver (`isolation.endgame`) and the tablebase.
+
+The public interface is the same as the one of `isolation.Board`, so any
+player written against `Board` runs on a `BitBoard` unchanged.
+"""
+from .isolation import Board, get_move_map, get_zobrist_keys, get_shuffle
+
+
+# (width, height) -> (knight masks, coordinates, full mask). Shared by every
+# BitBoard of the same size
+_tables = {}
+
+# (width, height) -> {mask of knight moves from a cell: tuple of their
+# coordinates}. Filled on demand, it has at most 2**8 entries per cell
+_move_lists = {}
+
+
+def _get_tables(width, height):
+    """Return the precomputed knight attack masks, the (row, column)
+    coordinates of every cell and the mask with every cell set for a board of
+    the given size.
+    """
+    tables = _tables.get((width, height))
+    if tables is None:
+        neighbors, coords = get_move_map(width, height)
+        knight = tuple(sum(1 << n for n in cell) for cell in neighbors)
+        tables = knight, coords, (1 << (width * height)) - 1
+        _tables[(width, height)] = tables
+    return tables
+
+
+def flood_fill(knight, frontier, allowed, limit=None):
+    """Return the cells of the mask allowed reachable through knight moves
+    from the cells of frontier, frontier included. knight holds the knight
+    attack mask of every cell, see _get_tables. If limit is given, None is
+    returned as soon as the region has more cells than limit.
+    """
+    region = frontier
+    while frontier:
+        if limit is not None and region.bit_count() > limit:
+            return None
+        reached = 0
+        while frontier:
+            low = frontier & -frontier
+            reached |= knight[low.bit_length() - 1]
+            frontier ^= low
+        frontier = reached & allowed & ~region
+        region |= frontier
+    return region
+
+
+class BitBoard(Board):
+    """Implement a model for the game Isolation assuming each player moves like
+    a knight in chess, using integer bitmasks for the board state.
+
+    Parameters
+    ----------
+    player_1 : object
+        An object with a get_move() function. This is the only function
+        directly called by the Board class for each player.
+
+    player_2 : object
+        An object with a get_move() function. This is the only function
+        directly called by the Board class for each player.
+
+    width : int (optional)
+        The number of columns that the board should have.
+
+    height : int (optional)
+        The number of rows that the board should have.
+
+    shuffle : bool (optional)
+        If False the legal moves are returned in a fixed order instead of
+        being shuffled, which makes searches faster and reproducible.
+
+    seed : hashable (optional)
+        Seed of the random generator used to shuffle the legal moves of this
+        game and of all its copies, so a game can be replayed exactly.
+    """
+
+    __slots__ = ('_blocked', '_knight', '_full', '_move_lists')
+
+    def __init__(self, player_1, player_2, width=7, height=7, shuffle=True, seed=None):
+        self.width = width
+        self.height = height
+        self.move_count = 0
+        self._player_1 = player_1
+        self._player_2 = player_2
+        self._active_player = player_1
+        self._inactive_player = player_2
+
+        # bit idx of _blocked is set once a player has visited cell idx;
+        # _p1_loc and _p2_loc hold the cell index of each player and
+        # _initiative is 0 when player 1 is to move and 1 for player 2
+        self._blocked = 0
+        self._p1_loc = Board.NOT_MOVED
+        self._p2_loc = Board.NOT_MOVED
+        self._initiative = 0
+        self._blank_count = width * height
+        self._knight, self._coords, self._full = _get_tables(width, height)
+        self._move_lists = _move_lists.setdefault((width, height), {})
+        # neighbor lists of the move map, used by the methods inherited from
+        # `Board` that generate moves from a cell (issymmetrical)
+        self._move_map = get_move_map(width, height)[0]
+        self._zobrist = get_zobrist_keys(width, height)
+        self._hash = 0
+        self._history = []
+        self._shuffle = get_shuffle(shuffle, seed)
+
+    @property
+    def _board_state(self):
+        """Cells in the layout used by `Board`. They are only built on demand
+        for the rarely used methods inherited from `Board` (to_string,
+        issymmetrical).
+        """
+        blocked = self._blocked
+        return bytearray((blocked >> idx) & 1 for idx in range(self.width * self.height))
+
+    def hash(self):
+        """Return the 64 bit Zobrist key of the position, identical to the one
+        of the equivalent `Board`."""
+        return self._hash
+
+    def copy(self):
+        """ Return a deep copy of the current board. The undo stack is not
+        copied, so moves applied before the copy can't be undone on it. """
+        new_board = BitBoard.__new__(BitBoard)
+        new_board.width = self.width
+        new_board.height = self.height
+        new_board.move_count = self.move_count
+        new_board._player_1 = self._player_1
+        new_board._player_2 = self._player_2
+        new_board._active_player = self._active_player
+        new_board._inactive_player = self._inactive_player
+        new_board._blocked = self._blocked
+        new_board._p1_loc = self._p1_loc
+        new_board._p2_loc = self._p2_loc
+        new_board._initiative = self._initiative
+        new_board._blank_count = self._blank_count
+        new_board._knight = self._knight
+        new_board._coords = self._coords
+        new_board._move_map = self._move_map
+        new_board._full = self._full
+        new_board._move_lists = self._move_lists
+        new_board._zobrist = self._zobrist
+        new_board._hash = self._hash
+        new_board._history = []
+        new_board._shuffle = self._shuffle
+        return new_board
+
+    def _blocked_mask(self):
+        """Return the blocked cells as a bitmask, bit idx for cell idx."""
+        return self._blocked
+
+    def _set_blocked(self, blocked):
+        """Replace the blocked cells by the cells of the bitmask."""
+        self._blocked = blocked
+
+    def move_is_legal(self, move):
+        """Test whether a move is legal in the current game state.
+
+        Parameters
+        ----------
+        move : (int, int)
+            A coordinate pair (row, column) indicating the next position for
+            the active player on the board.
+
+        Returns
+        -------
+        bool
+            Returns True if the move is legal, False otherwise
+        """
+        return (0 <= move[0] < self.height and 0 <= move[1] < self.width and
+                not (self._blocked >> (move[0] + move[1] * self.height)) & 1)
+
+    def get_blank_spaces(self):
+        """Return a list of the locations that are still available on the board.
+        """
+        return self._mask_to_moves(self._full & ~self._blocked)
+
+    def _open_mask(self, player):
+        """Return the mask of the cells the player can move to."""
+        idx = self._location_index(player)
+        if idx == Board.NOT_MOVED:
+            return self._full & ~self._blocked
+        return self._knight[idx] & ~self._blocked
+
+    def get_legal_moves(self, player=None):
+        """Return the list of all legal moves for the specified player.
+
+        Parameters
+        ----------
+        player : object (optional)
+            An object registered as a player in the current game. If None,
+            return the legal moves for the active player on the board.
+
+        Returns
+        -------
+        list<(int, int)>
+            The list of coordinate pairs (row, column) of all legal moves
+            for the player constrained by the current game state.
+        """
+        if player is None:
+            player = self._active_player
+        idx = self._location_index(player)
+        if idx == Board.NOT_MOVED:
+            return self.get_blank_spaces()
+        mask = self._knight[idx] & ~self._blocked
+        moves = self._move_lists.get(mask)
+        if moves is None:
+            moves = self._move_lists[mask] = tuple(self._mask_to_moves(mask))
+        valid_moves = list(moves)
+        if self._shuffle is not None:
+            self._shuffle(valid_moves)
+        return valid_moves
+
+    def count_moves(self, player=None):
+        """Return the number of legal moves of the specified player (the
+        active player if None) without building the list of moves.
+        """
+        if player is None:
+            player = self._active_player
+        if player == self._player_1:
+            idx = self._p1_loc
+        elif player == self._player_2:
+            idx = self._p2_loc
+        else:
+            raise RuntimeError(
+                "Invalid player in count_moves: {}".format(player))
+        if idx == Board.NOT_MOVED:
+            return self._blank_count
+        return (self._knight[idx] & ~self._blocked).bit_count()
+
+    def get_region(self, player=None, limit=None):
+        """Return the mask of the blank cells the specified player (the active
+        player if None) can still reach through any sequence of knight moves,
+        or None if there are more than limit of them.
+        """
+        if player is None:
+            player = self._active_player
+        return flood_fill(self._knight, self._open_mask(player), ~self._blocked, limit)
+
+    def apply_move(self, move):
+        """Move the active player to a specified location.
+
+        Parameters
+        ----------
+        move : (int, int)
+            A coordinate pair (row, column) indicating the next position for
+            the active player on the board.
+        """
+        idx = move[0] + move[1] * self.height
+        cell_keys, loc_keys, side_key = self._zobrist
+        if self._active_player == self._player_1:
+            player_keys = loc_keys[0]
+            prev_idx, self._p1_loc = self._p1_loc, idx
+        else:
+            player_keys = loc_keys[1]
+            prev_idx, self._p2_loc = self._p2_loc, idx
+        self._history.append((prev_idx, self._hash))
+        if prev_idx != Board.NOT_MOVED:
+            self._hash ^= player_keys[prev_idx]
+        self._hash ^= cell_keys[idx] ^ player_keys[idx] ^ side_key
+        self._blocked |= 1 << idx
+        self._blank_count -= 1
+        self._initiative ^= 1
+        self._active_player, self._inactive_player = self._inactive_player, self._active_player
+        self.move_count += 1
+
+        return self
+
+    def undo_move(self):
+        """Take back the last move applied with apply_move, including the
+        opening placement of a player. The hash of the position is restored.
+        """
+        prev_idx, self._hash = self._history.pop()
+        if self._inactive_player == self._player_1:
+            idx, self._p1_loc = self._p1_loc, prev_idx
+        else:
+            idx, self._p2_loc = self._p2_loc, prev_idx
+        self._blocked &= ~(1 << idx)
+        self._blank_count += 1
+        self._initiative ^= 1
+        self._active_player, self._inactive_player = self._inactive_player, self._active_player
+        self.move_count -= 1
+
+        return self
+
+    def reverse_move(self, previous_loc, current_loc):
+        """Take a step back
+        param previous_loc location where the player was
+        param rev location where the player is now
+
+        When the move was applied on this board the undo stack is used and
+        the locations are ignored, see undo_move"""
+        if self._history:
+            self.undo_move()
+            return
+        idx = previous_loc[0] + previous_loc[1]*self.height
+        revidx = current_loc[0] + current_loc[1]*self.height
+        cell_keys, loc_keys, side_key = self._zobrist
+        if self._active_player == self._player_1:
+            player_keys = loc_keys[1]
+            self._p2_loc = idx
+        else:
+            player_keys = loc_keys[0]
+            self._p1_loc = idx
+        self._hash ^= cell_keys[revidx] ^ player_keys[revidx] ^ player_keys[idx] ^ side_key
+        self._blocked &= ~(1 << revidx)
+        self._blank_count += 1
+        self._initiative ^= 1
+        self._active_player, self._inactive_player = self._inactive_player, self._active_player
+        self.move_count -= 1
+
+    def is_winner(self, player):
+        """ Test whether the specified player has won the game. """
+        return player == self._inactive_player and not self._open_mask(self._active_player)
+
+    def is_loser(self, player):
+        """ Test whether the specified player has lost the game. """
+        return player == self._active_player and not self._open_mask(self._active_player)
+
+    def utility(self, player):
+        """Returns the utility of the current game state from the perspective
+        of the specified player.
+
+                    /  +infinity,   "player" wins
+        utility =  |   -infinity,   "player" loses
+                    \          0,    otherwise
+
+        Parameters
+        ----------
+        player : object (optional)
+            An object registered as a player in the current game. If None,
+            return the utility for the active player on the board.
+
+        Returns
+        ----------
+        float
+            The utility value of the current game state for the specified
+            player. The game has a utility of +inf if the player has won,
+            a value of -inf if the player has lost, and a value of 0
+            otherwise.
+        """
+        if not self._open_mask(self._active_player):
+
+            if player == self._inactive_player:
+                return float("inf")
+
+            if player == self._active_player:
+                return float("-inf")
+
+        return 0.
+
+    def _mask_to_moves(self, mask):
+        """Convert a mask of cells to the list of their (row, column)
+        coordinates, in increasing cell index order.
+        """
+        coords = self._coords
+        moves = []
+        while mask:
+            low = mask & -mask
+            moves.append(coords[low.bit_length() - 1])
+            mask ^= low
+        return moves
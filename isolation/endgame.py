@@ -0,0 +1,179 @@
+"""
+Exact play of partitioned positions.
+
+Once no blank cell can be reached by both players (see
+`Board.is_partitioned`) each of them moves alone in its own region until it
+runs out of moves, so the player to move wins if and only if its longest
+knight path is longer than the one of its opponent, and the first move of a
+longest path is always a best move.
+
+Longest paths are found with a depth first search over the region of the
+player, memoized on (cell, region bitmask). After every move the region is
+shrunk to the cells still reachable from the new cell, which keeps the number
+of distinct regions small. Moves are tried in Warnsdorff order and a move is
+skipped when an upper bound on the length of its paths (knight moves
+alternate between light and dark cells, dead ends can only end a path) shows
+it can't beat the best path found so far.
+"""
+from .isolation import Board
+from .bitboard import _get_tables, flood_fill
+
+
+# (width, height) -> {(cell index, region mask): longest path length}. It is
+# kept from move to move of a partitioned game, the players clear it with
+# clear_memo as long as their game is not partitioned
+_memo = {}
+
+# the memo of a board size is cleared when it reaches this many entries, about
+# 140 bytes each
+MEMO_LIMIT = 1 << 17
+
+# (width, height) -> mask of the cells with an even row + column
+_light = {}
+
+
+def longest_path(game, player=None, check_time=None):
+    """Return the length of the longest knight path of the player through the
+    blank cells it can still reach, and the first move of such a path.
+
+    Parameters
+    ----------
+    game : `isolation.Board`
+        The position, either a `Board` or a `BitBoard`.
+
+    player : object (optional)
+        A player of the game that has already moved, the active player if
+        None.
+
+    check_time : callable (optional)
+        Called before every new (cell, region) pair is searched, so a caller
+        with a deadline can abort the search by raising an exception.
+
+    Returns
+    -------
+    (int, (int, int))
+        The number of moves the player can still make if it was alone on the
+        board, and its first move, (-1, -1) if it has no legal move.
+    """
+    if player is None:
+        player = game.active_player
+    start = game._location_index(player)
+    if start == Board.NOT_MOVED:
+        raise ValueError("longest_path needs a player that has already moved")
+
+    knight, coords, _ = _get_tables(game.width, game.height)
+    light = _get_light_mask(game.width, game.height)
+    memo = _memo.setdefault((game.width, game.height), {})
+
+    region = game.get_region(player)
+    best_length, best_move = 0, (-1, -1)
+    bound = _upper_bound(knight, start, region, light)
+    for cell, reach in _successors(knight, start, region):
+        if best_length >= bound:
+            break
+        if 1 + _upper_bound(knight, cell, reach, light) <= best_length:
+            continue
+        length = 1 + _search(knight, light, memo, cell, reach, check_time)
+        if length > best_length:
+            best_length, best_move = length, coords[cell]
+    return best_length, best_move
+
+
+def partition_winner(game, check_time=None):
+    """Return the winner of a partitioned position with perfect play.
+
+    Returns
+    -------
+    (object, int, int)
+        The winning player, and the lengths of the longest paths of the
+        active and of the inactive player.
+    """
+    active, _ = longest_path(game, game.active_player, check_time)
+    inactive, _ = longest_path(game, game.inactive_player, check_time)
+    # the active player runs out of moves first when its path isn't longer
+    winner = game.active_player if active > inactive else game.inactive_player
+    return winner, active, inactive
+
+
+def clear_memo():
+    """Forget the longest paths solved so far, to free their memory once the
+    game they were solved for is over, or so that the next searches start
+    from scratch (to time them, for instance)."""
+    _memo.clear()
+
+
+def _search(knight, light, memo, cell, region, check_time):
+    """Return the length of the longest path starting at cell (already
+    visited) through the cells of region."""
+    key = (cell, region)
+    best = memo.get(key)
+    if best is not None:
+        return best
+    if check_time is not None:
+        check_time()
+
+    best = 0
+    bound = _upper_bound(knight, cell, region, light)
+    for target, reach in _successors(knight, cell, region):
+        if best >= bound:
+            break
+        if 1 + _upper_bound(knight, target, reach, light) <= best:
+            continue
+        length = 1 + _search(knight, light, memo, target, reach, check_time)
+        if length > best:
+            best = length
+    if len(memo) >= MEMO_LIMIT:
+        memo.clear()
+    memo[key] = best
+    return best
+
+
+def _successors(knight, cell, region):
+    """Return the (cell, region) pairs reached by every move from cell,
+    the cells with the fewest onward moves first (Warnsdorff's rule), which
+    finds long paths early and lets the bounds prune the other moves."""
+    successors = []
+    moves = knight[cell] & region
+    while moves:
+        low = moves & -moves
+        moves ^= low
+        target = low.bit_length() - 1
+        rest = region ^ low
+        successors.append((bin(knight[target] & rest).count("1"), target,
+                           flood_fill(knight, knight[target] & rest, rest)))
+    successors.sort()
+    return [(target, reach) for _, target, reach in successors]
+
+
+def _upper_bound(knight, cell, region, light):
+    """Return an upper bound on the length of a path from cell through
+    region. The path alternates between cells of the other color than cell
+    and cells of the same color, starting with the other one, and visits at
+    most one of the dead end cells of the region."""
+    if (light >> cell) & 1:
+        other, same = region & ~light, region & light
+    else:
+        other, same = region & light, region & ~light
+    bound = min(2 * bin(other).count("1"), 2 * bin(same).count("1") + 1)
+    # a cell with a single neighbor in the region can only end the path
+    reachable = region | (1 << cell)
+    dead_ends = 0
+    cells = region
+    while cells:
+        low = cells & -cells
+        cells ^= low
+        if bin(knight[low.bit_length() - 1] & reachable).count("1") < 2:
+            dead_ends += 1
+    if dead_ends > 1:
+        bound = min(bound, bin(region).count("1") - dead_ends + 1)
+    return bound
+
+
+def _get_light_mask(width, height):
+    """Return the mask of the cells with an even row + column."""
+    light = _light.get((width, height))
+    if light is None:
+        light = sum(1 << (row + col * height)
+                    for col in range(width) for row in range(height) if (row + col) % 2 == 0)
+        _light[(width, height)] = light
+    return light
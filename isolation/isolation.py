@@ -8,11 +8,125 @@ remain compatible with the defaults provided, and none of your changes will
 be available to project reviewers.
 """
 import random
+import struct
 import timeit
-from copy import copy
 
 TIME_LIMIT_MILLIS = 700
 
+# (width, height) -> (neighbors, coordinates), built on first use and shared
+# by every board of the same size
+_move_maps = {}
+
+# (width, height) -> Zobrist keys, see get_zobrist_keys
+_zobrist_keys = {}
+
+# (width, height) -> cell permutations, see get_symmetries
+_symmetries = {}
+
+# header of Board.to_bytes: width, height, cell index of each player (-1 if
+# it has not moved) and initiative, followed by the blocked cells bitmask
+_position_header = struct.Struct('<BBhhB')
+
+
+def get_move_map(width, height):
+    """Return the knight move map for a board of the given size.
+
+    Returns
+    -------
+    (tuple<tuple<int>>, tuple<(int, int)>)
+        For every cell index (row + column * height) the sorted tuple of the
+        indices of the on-board cells a knight can jump to from it, and the
+        (row, column) coordinates of every cell index.
+    """
+    move_map = _move_maps.get((width, height))
+    if move_map is None:
+        neighbors = []
+        coords = []
+        for idx in range(width * height):
+            r, c = idx % height, idx // height
+            coords.append((r, c))
+            neighbors.append(tuple(sorted(r + dr + (c + dc) * height for dr, dc in Board.directions
+                                          if 0 <= r + dr < height and 0 <= c + dc < width)))
+        move_map = tuple(neighbors), tuple(coords)
+        _move_maps[(width, height)] = move_map
+    return move_map
+
+
+def get_zobrist_keys(width, height):
+    """Return the random 64 bit keys used to hash the positions of a board of
+    the given size. The keys are generated from a fixed seed, so a position
+    has the same hash in every run of the program.
+
+    Returns
+    -------
+    (tuple<int>, (tuple<int>, tuple<int>), int)
+        The key of every blocked cell, the key of every location of player 1
+        and of player 2, and the key xored in when player 2 has the initiative.
+    """
+    keys = _zobrist_keys.get((width, height))
+    if keys is None:
+        rng = random.Random("zobrist {}x{}".format(width, height))
+        size = width * height
+        cell_keys = tuple(rng.getrandbits(64) for _ in range(size))
+        loc_keys = (tuple(rng.getrandbits(64) for _ in range(size)),
+                    tuple(rng.getrandbits(64) for _ in range(size)))
+        keys = cell_keys, loc_keys, rng.getrandbits(64)
+        _zobrist_keys[(width, height)] = keys
+    return keys
+
+
+def get_symmetries(width, height):
+    """Return the symmetries of a board of the given size: the identity, the
+    two mirrors and the half turn, plus the two diagonal mirrors and the
+    quarter turns on square boards.
+
+    Returns
+    -------
+    tuple<(tuple<int>, tuple<int>)>
+        For every symmetry the permutation mapping each cell index to the
+        index of its image, and the inverse permutation.
+    """
+    symmetries = _symmetries.get((width, height))
+    if symmetries is None:
+        h, w = height - 1, width - 1
+        transforms = [lambda r, c: (r, c), lambda r, c: (h - r, c),
+                      lambda r, c: (r, w - c), lambda r, c: (h - r, w - c)]
+        if width == height:
+            transforms += [lambda r, c: (c, r), lambda r, c: (w - c, h - r),
+                           lambda r, c: (c, h - r), lambda r, c: (w - c, r)]
+        symmetries = []
+        for transform in transforms:
+            perm = [0] * (width * height)
+            inverse = [0] * (width * height)
+            for idx in range(width * height):
+                r, c = transform(idx % height, idx // height)
+                perm[idx] = r + c * height
+                inverse[r + c * height] = idx
+            symmetries.append((tuple(perm), tuple(inverse)))
+        symmetries = tuple(symmetries)
+        _symmetries[(width, height)] = symmetries
+    return symmetries
+
+
+def get_shuffle(shuffle=True, seed=None):
+    """Return the function used by a board to shuffle its lists of legal
+    moves, or None when the moves are returned in a fixed order.
+
+    Parameters
+    ----------
+    shuffle : bool (optional)
+        False to return the moves in a fixed order (increasing cell index).
+
+    seed : hashable (optional)
+        Seed of a random generator owned by the game. If None the moves are
+        shuffled with the global generator of the `random` module.
+    """
+    if not shuffle:
+        return None
+    if seed is None:
+        return random.shuffle
+    return random.Random(seed).shuffle
+
 
 class Board(object):
     """Implement a model for the game Isolation assuming each player moves like
@@ -33,13 +147,29 @@ class Board(object):
 
     height : int (optional)
         The number of rows that the board should have.
+
+    shuffle : bool (optional)
+        If False the legal moves are returned in a fixed order instead of
+        being shuffled, which makes searches faster and reproducible.
+
+    seed : hashable (optional)
+        Seed of the random generator used to shuffle the legal moves of this
+        game and of all its copies, so a game can be replayed exactly.
     """
     BLANK = 0
     NOT_MOVED = None
     directions = ([(-2, -1), (-2, 1), (-1, -2), (-1, 2),
                   (1, -2), (1, 2), (2, -1), (2, 1)])
 
-    def __init__(self, player_1, player_2, width=7, height=7):
+    # a new board is created for every node visited by the forecast_move
+    # based searches, slots keep them small and cheap to copy
+    __slots__ = ('width', 'height', 'move_count', '_player_1', '_player_2',
+                 '_active_player', '_inactive_player', '_board_state',
+                 '_p1_loc', '_p2_loc', '_initiative', '_move_map', '_coords',
+                 '_blank_count', '_p1_moves', '_p2_moves', '_zobrist', '_hash',
+                 '_history', '_shuffle')
+
+    def __init__(self, player_1, player_2, width=7, height=7, shuffle=True, seed=None):
         self.width = width
         self.height = height
         self.move_count = 0
@@ -48,20 +178,37 @@ class Board(object):
         self._active_player = player_1
         self._inactive_player = player_2
 
-        # The last 3 entries of the board state includes initiative (0 for
-        # player 1, 1 for player 2) player 2 last move, and player 1 last move
-        self._board_state = [Board.BLANK] * (width * height + 3)
-        self._board_state[-1] = Board.NOT_MOVED
-        self._board_state[-2] = Board.NOT_MOVED
-        
-        #initialize available move map:
-        #if not move_map:
-         #   initializeMoveMap()
-        #else
-        #    self.move_map = move_map
+        # one byte per cell (1 once a player visited it), the cell index of
+        # each player and the initiative (0 for player 1, 1 for player 2)
+        self._board_state = bytearray(width * height)
+        self._p1_loc = Board.NOT_MOVED
+        self._p2_loc = Board.NOT_MOVED
+        self._initiative = 0
+        self._blank_count = width * height
+
+        # number of legal moves of each player, None until count_moves needs it
+        self._p1_moves = None
+        self._p2_moves = None
+
+        # available move map, shared by all the boards of the same size
+        self._move_map, self._coords = get_move_map(width, height)
+
+        # Zobrist key of the position, updated incrementally by apply_move and
+        # reverse_move
+        self._zobrist = get_zobrist_keys(width, height)
+        self._hash = 0
+
+        # undo stack: apply_move pushes the previous location of the moving
+        # player, the previous hash and move counts, undo_move pops them
+        self._history = []
+
+        # shuffles the lists of legal moves, None for a fixed move order
+        self._shuffle = get_shuffle(shuffle, seed)
 
     def hash(self):
-        return str(self._board_state).__hash__()
+        """Return the 64 bit Zobrist key of the position. It covers the blocked
+        cells, the locations of both players and the initiative."""
+        return self._hash
 
     @property
     def active_player(self):
@@ -71,7 +218,7 @@ class Board(object):
         return self._active_player
 
     def check(self):
-        return self._board_state[-1], self._board_state[-2], self._board_state[-3]
+        return self._p1_loc, self._p2_loc, self._initiative
 
     @property
     def inactive_player(self):
@@ -102,14 +249,89 @@ class Board(object):
         raise RuntimeError("`player` must be an object registered as a player in the current game.")
 
     def copy(self):
-        """ Return a deep copy of the current board. """
-        new_board = Board(self._player_1, self._player_2, width=self.width, height=self.height)
+        """ Return a deep copy of the current board. The undo stack is not
+        copied, so moves applied before the copy can't be undone on it. """
+        new_board = Board.__new__(Board)
+        new_board.width = self.width
+        new_board.height = self.height
         new_board.move_count = self.move_count
+        new_board._player_1 = self._player_1
+        new_board._player_2 = self._player_2
         new_board._active_player = self._active_player
         new_board._inactive_player = self._inactive_player
-        new_board._board_state = copy(self._board_state)
+        new_board._board_state = self._board_state[:]
+        new_board._p1_loc = self._p1_loc
+        new_board._p2_loc = self._p2_loc
+        new_board._initiative = self._initiative
+        new_board._blank_count = self._blank_count
+        new_board._p1_moves = self._p1_moves
+        new_board._p2_moves = self._p2_moves
+        new_board._move_map = self._move_map
+        new_board._coords = self._coords
+        new_board._zobrist = self._zobrist
+        new_board._hash = self._hash
+        new_board._history = []
+        new_board._shuffle = self._shuffle
         return new_board
 
+    def to_bytes(self):
+        """Return a compact serialization of the position: board size,
+        player locations, initiative and the blocked cells as a bitmask. The
+        players, the undo stack and the move order are not included, see
+        from_bytes.
+        """
+        loc = [-1 if idx == Board.NOT_MOVED else idx for idx in (self._p1_loc, self._p2_loc)]
+        header = _position_header.pack(self.width, self.height, loc[0], loc[1], self._initiative)
+        return header + self._blocked_mask().to_bytes((self.width * self.height + 7) // 8, 'little')
+
+    @classmethod
+    def from_bytes(cls, data, player_1, player_2, shuffle=True, seed=None):
+        """Rebuild a position serialized with to_bytes on a new board of
+        this class, played by the given players. The hash and the number of
+        moves played are recomputed, the undo stack starts empty.
+        """
+        width, height, p1_loc, p2_loc, initiative = _position_header.unpack_from(data)
+        board = cls(player_1, player_2, width, height, shuffle=shuffle, seed=seed)
+        board._set_position(int.from_bytes(data[_position_header.size:], 'little'),
+                            Board.NOT_MOVED if p1_loc < 0 else p1_loc,
+                            Board.NOT_MOVED if p2_loc < 0 else p2_loc, initiative)
+        return board
+
+    def _blocked_mask(self):
+        """Return the blocked cells as a bitmask, bit idx for cell idx."""
+        board_state = self._board_state
+        return sum(1 << idx for idx in range(len(board_state)) if board_state[idx])
+
+    def _set_blocked(self, blocked):
+        """Replace the blocked cells by the cells of the bitmask."""
+        self._board_state = bytearray((blocked >> idx) & 1 for idx in range(self.width * self.height))
+
+    def _set_position(self, blocked, p1_loc, p2_loc, initiative):
+        """Set up the position of a new board from its blocked cells, player
+        locations and initiative, recomputing everything derived from them.
+        """
+        self._set_blocked(blocked)
+        self._p1_loc = p1_loc
+        self._p2_loc = p2_loc
+        self._initiative = initiative
+        if initiative:
+            self._active_player, self._inactive_player = self._player_2, self._player_1
+        self.move_count = bin(blocked).count("1")
+        self._blank_count = self.width * self.height - self.move_count
+        self._p1_moves = self._p2_moves = None
+        self._history = []
+
+        cell_keys, (p1_keys, p2_keys), side_key = self._zobrist
+        key = side_key if initiative else 0
+        for idx in range(self.width * self.height):
+            if (blocked >> idx) & 1:
+                key ^= cell_keys[idx]
+        if p1_loc != Board.NOT_MOVED:
+            key ^= p1_keys[p1_loc]
+        if p2_loc != Board.NOT_MOVED:
+            key ^= p2_keys[p2_loc]
+        self._hash = key
+
     def forecast_move(self, move):
         """Return a deep copy of the current game with an input move applied to
         advance the game one ply.
@@ -151,11 +373,60 @@ class Board(object):
     def get_blank_spaces(self):
         """Return a list of the locations that are still available on the board.
         """
-        return [(i, j) for j in range(self.width) for i in range(self.height)
-                if self._board_state[i + j * self.height] == Board.BLANK]
+        board_state = self._board_state
+        coords = self._coords
+        blank_spaces = []
+        idx = board_state.find(Board.BLANK)
+        while idx >= 0:
+            blank_spaces.append(coords[idx])
+            idx = board_state.find(Board.BLANK, idx + 1)
+        return blank_spaces
 
     def get_max_moves(self):
-        return self.height*self.width-self.move_count
+        """Return the number of blank cells, an upper bound on the number of
+        moves left in the game. It is tracked by apply_move and undo_move."""
+        return self._blank_count
+
+    def canonical_hash(self):
+        """Return the smallest Zobrist key over all the symmetric variants of
+        the position, so that every variant can share one entry in a
+        transposition table, opening book or endgame table.
+
+        Returns
+        -------
+        (int, int)
+            The canonical key and the index of the symmetry that maps the
+            position to its canonical variant. Pass the index to
+            canonical_move and restore_move to convert moves between the
+            two frames.
+        """
+        cell_keys, (p1_keys, p2_keys), side_key = self._zobrist
+        board_state = self._board_state
+        blocked = [idx for idx in range(self.width * self.height) if board_state[idx]]
+        best_key = best_symmetry = None
+        for symmetry, (perm, _) in enumerate(get_symmetries(self.width, self.height)):
+            key = side_key if self._initiative else 0
+            for idx in blocked:
+                key ^= cell_keys[perm[idx]]
+            if self._p1_loc != Board.NOT_MOVED:
+                key ^= p1_keys[perm[self._p1_loc]]
+            if self._p2_loc != Board.NOT_MOVED:
+                key ^= p2_keys[perm[self._p2_loc]]
+            if best_key is None or key < best_key:
+                best_key, best_symmetry = key, symmetry
+        return best_key, best_symmetry
+
+    def canonical_move(self, move, symmetry):
+        """Map a move of this position to the frame of its canonical variant,
+        symmetry being the index returned by canonical_hash."""
+        perm, _ = get_symmetries(self.width, self.height)[symmetry]
+        return self._coords[perm[move[0] + move[1] * self.height]]
+
+    def restore_move(self, move, symmetry):
+        """Map a move of the canonical variant back to this position, the
+        inverse of canonical_move."""
+        _, inverse = get_symmetries(self.width, self.height)[symmetry]
+        return self._coords[inverse[move[0] + move[1] * self.height]]
 
     def issymmetrical(self):
         """
@@ -398,20 +669,19 @@ class Board(object):
             The coordinate pair (row, column) of the input player, or None
             if the player has not moved.
         """
+        idx = self._location_index(player)
+        if idx == Board.NOT_MOVED:
+            return Board.NOT_MOVED
+        return self._coords[idx]
+
+    def _location_index(self, player):
+        """Return the cell index of the player, or None if it has not moved."""
         if player == self._player_1:
-            if self._board_state[-1] == Board.NOT_MOVED:
-                return Board.NOT_MOVED
-            idx = self._board_state[-1]
+            return self._p1_loc
         elif player == self._player_2:
-            if self._board_state[-2] == Board.NOT_MOVED:
-                return Board.NOT_MOVED
-            idx = self._board_state[-2]
-        else:
-            raise RuntimeError(
-                "Invalid player in get_player_location: {}".format(player))
-        w = idx // self.height
-        h = idx % self.height
-        return (h, w)
+            return self._p2_loc
+        raise RuntimeError(
+            "Invalid player in get_player_location: {}".format(player))
 
     def get_legal_moves(self, player=None):
         """Return the list of all legal moves for the specified player.
@@ -430,7 +700,82 @@ class Board(object):
         """
         if player is None:
             player = self.active_player
-        return self.__get_moves(self.get_player_location(player))
+        idx = self._location_index(player)
+        if idx == Board.NOT_MOVED:
+            return self.get_blank_spaces()
+        return self.__get_moves_from(idx)
+
+    def count_moves(self, player=None):
+        """Return the number of legal moves of the specified player (the
+        active player if None) without building the list of moves.
+
+        The counts are cached on the board, apply_move only adjusts the count
+        of the opponent of the moving player and undo_move restores both.
+        """
+        if player is None:
+            player = self._active_player
+        if player == self._player_1:
+            if self._p1_moves is None:
+                self._p1_moves = self.__count_moves_from(self._p1_loc)
+            return self._p1_moves
+        elif player == self._player_2:
+            if self._p2_moves is None:
+                self._p2_moves = self.__count_moves_from(self._p2_loc)
+            return self._p2_moves
+        raise RuntimeError(
+            "Invalid player in count_moves: {}".format(player))
+
+    def get_region(self, player=None, limit=None):
+        """Return the blank cells the specified player (the active player if
+        None) can still reach through any sequence of knight moves, found by
+        a flood fill over the blank cells.
+
+        Parameters
+        ----------
+        player : object (optional)
+            An object registered as a player in the current game.
+
+        limit : int (optional)
+            Stop the flood fill and return None as soon as more cells than
+            this are found.
+
+        Returns
+        -------
+        int
+            Bitmask of the reachable cells, bit idx set for the cell index
+            idx. Every blank cell is reachable by a player that has not moved.
+        """
+        if player is None:
+            player = self._active_player
+        start = self._location_index(player)
+        board_state = self._board_state
+        if start == Board.NOT_MOVED:
+            if limit is not None and self._blank_count > limit:
+                return None
+            return sum(1 << idx for idx in range(len(board_state)) if not board_state[idx])
+        move_map = self._move_map
+        region = 0
+        size = 0
+        stack = [start]
+        while stack:
+            for n in move_map[stack.pop()]:
+                if not board_state[n] and not (region >> n) & 1:
+                    region |= 1 << n
+                    stack.append(n)
+                    size += 1
+            if limit is not None and size > limit:
+                return None
+        return region
+
+    def is_partitioned(self):
+        """Test whether the players can no longer interfere with each other:
+        both have moved and no blank cell is reachable by both of them. The
+        rest of the game is then two independent longest path problems, see
+        `isolation.endgame`.
+        """
+        if self._p1_loc == Board.NOT_MOVED or self._p2_loc == Board.NOT_MOVED:
+            return False
+        return not self.get_region(self._player_1) & self.get_region(self._player_2)
 
     def apply_move(self, move):
         """Move the active player to a specified location.
@@ -442,37 +787,87 @@ class Board(object):
             the active player on the board.
         """
         idx = move[0] + move[1] * self.height
-        last_move_idx = int(self.active_player == self._player_2) + 1
-        self._board_state[-last_move_idx] = idx
+        cell_keys, loc_keys, side_key = self._zobrist
+        p1_moves, p2_moves = self._p1_moves, self._p2_moves
+        if self._active_player == self._player_1:
+            player_keys = loc_keys[0]
+            prev_idx, self._p1_loc = self._p1_loc, idx
+            # the opponent loses a move if it could reach the blocked cell
+            self._p1_moves = None
+            if p2_moves is not None and (self._p2_loc == Board.NOT_MOVED or idx in self._move_map[self._p2_loc]):
+                self._p2_moves = p2_moves - 1
+        else:
+            player_keys = loc_keys[1]
+            prev_idx, self._p2_loc = self._p2_loc, idx
+            self._p2_moves = None
+            if p1_moves is not None and (self._p1_loc == Board.NOT_MOVED or idx in self._move_map[self._p1_loc]):
+                self._p1_moves = p1_moves - 1
+        self._history.append((prev_idx, self._hash, p1_moves, p2_moves))
+        if prev_idx != Board.NOT_MOVED:
+            self._hash ^= player_keys[prev_idx]
+        self._hash ^= cell_keys[idx] ^ player_keys[idx] ^ side_key
         self._board_state[idx] = 1
-        self._board_state[-3] ^= 1
+        self._blank_count -= 1
+        self._initiative ^= 1
         self._active_player, self._inactive_player = self._inactive_player, self._active_player
         self.move_count += 1
 
         return self
 
+    def undo_move(self):
+        """Take back the last move applied with apply_move, including the
+        opening placement of a player. The hash of the position and the move
+        counts are restored.
+        """
+        prev_idx, self._hash, self._p1_moves, self._p2_moves = self._history.pop()
+        if self._inactive_player == self._player_1:
+            idx, self._p1_loc = self._p1_loc, prev_idx
+        else:
+            idx, self._p2_loc = self._p2_loc, prev_idx
+        self._board_state[idx] = Board.BLANK
+        self._blank_count += 1
+        self._initiative ^= 1
+        self._active_player, self._inactive_player = self._inactive_player, self._active_player
+        self.move_count -= 1
+
+        return self
+
     def reverse_move(self, previous_loc, current_loc):
         """Take a step back
         param previous_loc location where the player was
-        param rev location where the player is now"""
+        param rev location where the player is now
+
+        When the move was applied on this board the undo stack is used and
+        the locations are ignored, see undo_move"""
+        if self._history:
+            self.undo_move()
+            return
         idx = previous_loc[0] + previous_loc[1]*self.height
         revidx = current_loc[0] +  current_loc[1]*self.height
-        prev_move_idx = int(self.active_player == self._player_1) +1
+        cell_keys, loc_keys, side_key = self._zobrist
+        if self._active_player == self._player_1:
+            player_keys = loc_keys[1]
+            self._p2_loc = idx
+        else:
+            player_keys = loc_keys[0]
+            self._p1_loc = idx
+        self._hash ^= cell_keys[revidx] ^ player_keys[revidx] ^ player_keys[idx] ^ side_key
         self._board_state[revidx] = self.BLANK
-        self._board_state[-prev_move_idx] = idx
+        self._blank_count += 1
+        self._p1_moves = self._p2_moves = None
 
-        self._board_state[-3] ^= 1
+        self._initiative ^= 1
 
         self._active_player, self._inactive_player = self._inactive_player, self._active_player
         self.move_count -= 1
 
     def is_winner(self, player):
         """ Test whether the specified player has won the game. """
-        return player == self._inactive_player and not self.get_legal_moves(self._active_player)
+        return player == self._inactive_player and not self.count_moves(self._active_player)
 
     def is_loser(self, player):
         """ Test whether the specified player has lost the game. """
-        return player == self._active_player and not self.get_legal_moves(self._active_player)
+        return player == self._active_player and not self.count_moves(self._active_player)
 
     def utility(self, player):
         """Returns the utility of the current game state from the perspective
@@ -496,7 +891,7 @@ class Board(object):
             a value of -inf if the player has lost, and a value of 0
             otherwise.
         """
-        if not self.get_legal_moves(self._active_player):
+        if not self.count_moves(self._active_player):
 
             if player == self._inactive_player:
                 return float("inf")
@@ -513,13 +908,28 @@ class Board(object):
         if loc == Board.NOT_MOVED:
             return self.get_blank_spaces()
 
-        r, c = loc
+        return self.__get_moves_from(loc[0] + loc[1] * self.height)
 
-        valid_moves = [(r + dr, c + dc) for dr, dc in self.directions
-                       if self.move_is_legal((r + dr, c + dc))]
-        random.shuffle(valid_moves)
+    def __get_moves_from(self, idx):
+        """Generate the list of possible moves from the cell index, using the
+        precomputed move map so only the occupancy has to be checked.
+        """
+        board_state = self._board_state
+        coords = self._coords
+        valid_moves = [coords[n] for n in self._move_map[idx] if not board_state[n]]
+        if self._shuffle is not None:
+            self._shuffle(valid_moves)
         return valid_moves
 
+    def __count_moves_from(self, idx):
+        """Count the blank cells a knight can jump to from the cell index, or
+        all the blank cells if the player has not moved yet.
+        """
+        if idx == Board.NOT_MOVED:
+            return self._blank_count
+        board_state = self._board_state
+        return len([n for n in self._move_map[idx] if not board_state[n]])
+
     def print_board(self):
         """DEPRECATED - use Board.to_string()"""
         return self.to_string()
@@ -529,8 +939,8 @@ class Board(object):
         the location of each player and indicating which cells have been
         blocked, and which remain open.
         """
-        p1_loc = self._board_state[-1]
-        p2_loc = self._board_state[-2]
+        p1_loc = self._p1_loc
+        p2_loc = self._p2_loc
 
         col_margin = len(str(self.height - 1)) + 1
         prefix = "{:<" + "{}".format(col_margin) + "}"
@@ -553,6 +963,17 @@ class Board(object):
 
         return out
 
+    def _notify_players(self, move):
+        """Pass a copy of the game and the move just applied to the
+        notify_move(game, move) method of the players that have one, so that
+        a player can ponder during the turn of its opponent and stop when
+        the opponent has moved.
+        """
+        for player in (self._player_1, self._player_2):
+            notify_move = getattr(player, "notify_move", None)
+            if notify_move is not None:
+                notify_move(self.copy(), move)
+
     def play(self, time_limit=TIME_LIMIT_MILLIS):
         """Execute a match between the players by alternately soliciting them
         to select a move and applying it in the game.
@@ -598,6 +1019,7 @@ class Board(object):
             move_history.append(list(curr_move))
 
             self.apply_move(curr_move)
+            self._notify_players(curr_move)
 
     def play_extra(self, time_limit=TIME_LIMIT_MILLIS):
         """Execute a match between the players by alternately soliciting them
@@ -644,3 +1066,4 @@ class Board(object):
             move_history.append(list(curr_move))
 
             self.apply_move(curr_move)
+            self._notify_players(curr_move)
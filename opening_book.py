@@ -0,0 +1,177 @@
+"""Opening book of searched best moves for the first plies of the game.
+
+The book is built offline by searching every position of the first plies
+with `AlphaBetaPlayer1`, one position per symmetry class (see
+`Board.canonical_hash`), and written to a binary file:
+
+    header : 16 bytes
+        magic b'ISOBOOK1', board width and height (1 byte each), 2 unused
+        bytes and the number of records (4 bytes)
+
+    records : 16 bytes each, sorted by key
+        canonical key of the position (8 bytes), cell index of the best move
+        in the frame of the canonical position (2 bytes), depth of the
+        search (2 bytes) and its score (4 byte float)
+
+`OpeningBook` memory maps the file and finds positions with a binary search,
+so a lookup takes microseconds and only the pages it touches are read.
+
+Build a book from the command line with
+
+    python opening_book.py --plies 2 --depth 6 --output opening.book
+"""
+import argparse
+import mmap
+import struct
+import time
+
+from isolation import Board
+from game_agent import AlphaBetaPlayer1
+from sample_players import improved_score
+
+MAGIC = b'ISOBOOK1'
+HEADER = struct.Struct('<8sBBxxI')
+RECORD = struct.Struct('<Qhhf')
+
+# placeholder for the opponent on the boards searched by the builder
+OPPONENT = "opponent"
+
+
+class OpeningBook:
+    """Read only view of a book file.
+
+    Parameters
+    ----------
+    path : str
+        Path of a file written by `write_book`.
+    """
+
+    def __init__(self, path):
+        with open(path, 'rb') as book_file:
+            self._map = mmap.mmap(book_file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.width, self.height, self.count = HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC:
+            raise ValueError("{} is not an opening book".format(path))
+
+    def probe(self, key):
+        """Return the (move cell index, depth, score) record stored for the
+        canonical key, or None."""
+        low, high = 0, self.count
+        while low < high:
+            mid = (low + high) // 2
+            mid_key = RECORD.unpack_from(self._map, HEADER.size + mid * RECORD.size)[0]
+            if mid_key < key:
+                low = mid + 1
+            else:
+                high = mid
+        if low < self.count:
+            record = RECORD.unpack_from(self._map, HEADER.size + low * RECORD.size)
+            if record[0] == key:
+                return record[1:]
+        return None
+
+    def lookup(self, game):
+        """Return the book move of the position, or None if the position is
+        not in the book."""
+        if game.width != self.width or game.height != self.height:
+            return None
+        key, symmetry = game.canonical_hash()
+        record = self.probe(key)
+        if record is None:
+            return None
+        move = (record[0] % game.height, record[0] // game.height)
+        return game.restore_move(move, symmetry)
+
+    def close(self):
+        self._map.close()
+
+    def __len__(self):
+        return self.count
+
+
+def build_book(plies=2, search_depth=6, score_fn=improved_score, time_limit=None, width=7, height=7,
+               verbose=False):
+    """Search the positions of the first plies of the game.
+
+    Parameters
+    ----------
+    plies : int (optional)
+        Positions with up to this many moves played are searched.
+
+    search_depth : int (optional)
+        Depth of the search of every position.
+
+    score_fn : callable (optional)
+        Evaluation function of the search. It has to handle players that
+        have not moved yet, which the mobility tables of game_agent.py
+        don't.
+
+    time_limit : float (optional)
+        Time in milliseconds allowed for the search of every position, the
+        search stops at search_depth if None.
+
+    Returns
+    -------
+    dict<int, (int, int, float)>
+        Canonical key -> (move cell index in the canonical frame, depth,
+        score) of every distinct position.
+    """
+    records = {}
+    layer = [Board(OPPONENT, OPPONENT, width, height, shuffle=False).to_bytes()]
+    for ply in range(plies + 1):
+        next_layer = {}
+        for data in layer:
+            # a new player for every position, so that no entry of the search of another position (where the
+            # player may have been in the other seat) or history of its moves changes the record
+            player = AlphaBetaPlayer1(search_depth=search_depth, score_fn=score_fn, tt_size=1 << 20)
+            game = (Board.from_bytes(data, player, OPPONENT, shuffle=False) if ply % 2 == 0 else
+                    Board.from_bytes(data, OPPONENT, player, shuffle=False))
+            key, symmetry = game.canonical_hash()
+            start = time.monotonic()
+            if time_limit is None:
+                time_left = lambda: float("inf")
+            else:
+                time_left = lambda: time_limit - (time.monotonic() - start) * 1000
+            move = player.get_move(game, time_left)
+            if move == (-1, -1):
+                continue
+            canonical = game.canonical_move(move, symmetry)
+            records[key] = canonical[0] + canonical[1] * height, player.depth, player.best_score
+            if verbose:
+                print("ply {} position {}: {} depth {} in {:.1f}s".format(
+                    ply, len(records), move, player.depth, time.monotonic() - start), flush=True)
+            if ply < plies:
+                for reply in game.get_legal_moves():
+                    child = game.forecast_move(reply)
+                    next_layer.setdefault(child.canonical_hash()[0], child.to_bytes())
+        layer = list(next_layer.values())
+    return records
+
+
+def write_book(path, records, width=7, height=7):
+    """Write the records returned by build_book to a book file."""
+    with open(path, 'wb') as book_file:
+        book_file.write(HEADER.pack(MAGIC, width, height, len(records)))
+        for key in sorted(records):
+            move, depth, score = records[key]
+            book_file.write(RECORD.pack(key, move, min(depth, 0x7fff), score))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build an opening book for AlphaBetaPlayer1.")
+    parser.add_argument('--output', default='opening.book', help="path of the book file")
+    parser.add_argument('--plies', type=int, default=2, help="number of plies covered by the book")
+    parser.add_argument('--depth', type=int, default=6, help="search depth of every position")
+    parser.add_argument('--time', type=float, default=None,
+                        help="time limit in milliseconds for the search of every position")
+    parser.add_argument('--size', type=int, nargs=2, default=(7, 7), metavar=('WIDTH', 'HEIGHT'))
+    args = parser.parse_args()
+
+    width, height = args.size
+    records = build_book(args.plies, args.depth, time_limit=args.time, width=width, height=height, verbose=True)
+    write_book(args.output, records, width, height)
+    print("{} positions written to {}".format(len(records), args.output))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,430 @@
+"""Parallel alpha-beta search on a pool of worker processes.
+
+`RootSplitPlayer` deals the root moves of every position round-robin to a
+`concurrent.futures.ProcessPoolExecutor`. Each worker receives the position in
+the compact form of `Board.to_bytes`, rebuilds it, and runs iterative
+deepening alpha-beta (the search of `AlphaBetaPlayer1`, with its own
+transposition table kept for the life of the worker process) over its share
+of the moves until the common deadline. The parent then picks the best move
+at the deepest iteration every worker completed.
+
+`LazySMPPlayer` runs the search of `AlphaBetaPlayer1` in the main process while
+helper processes run the same iterative deepening search on the same position,
+each with its own move order and a depth offset for every other helper. All
+of them share a `SharedTranspositionTable`, so the helpers mostly fill the
+table with results the main search picks up.
+
+The worker processes, and the shared transposition table of `LazySMPPlayer`
+and `PonderingPlayer`, are created by `start` (called by get_move when
+needed) and released by `close`, after which the player can be started
+again. The players are context managers that do both:
+
+    with RootSplitPlayer(search_depth=50) as player:
+        Board(player, opponent).play()
+"""
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, wait
+
+from isolation import Board
+from game_agent import AlphaBetaPlayer1, SearchTimeout, custom_score, endgame_move
+from transposition import SharedTranspositionTable
+
+# placeholder for the opponent on the boards rebuilt by the workers
+OPPONENT = "opponent"
+
+# per process search players of the workers, keyed by their parameters, so the
+# transposition table and history of a worker survive from move to move
+_worker_players = {}
+
+# shared transposition tables attached by the workers, keyed by name
+_shared_tables = {}
+
+
+def search_root_moves(data, first, moves, score_fn, search_depth, deadline, tt_size, timeout):
+    """Search a share of the root moves in a worker process.
+
+    Parameters
+    ----------
+    data : bytes
+        The position, serialized with `Board.to_bytes`.
+
+    first : bool
+        True if the searching player is player 1 of the game.
+
+    moves : list<(int, int)>
+        The root moves to search, best expected move first.
+
+    deadline : float
+        `time.monotonic()` value the search has to be finished by.
+
+    Returns
+    -------
+    list<(int, float, (int, int))>
+        The depth, best score and best move of every completed iteration.
+    """
+    key = (score_fn, tt_size, timeout)
+    player = _worker_players.get(key)
+    if player is None:
+        player = AlphaBetaPlayer1(search_depth=search_depth, score_fn=score_fn, timeout=timeout, tt_size=tt_size)
+        _worker_players[key] = player
+    game = Board.from_bytes(data, player, OPPONENT) if first else Board.from_bytes(data, OPPONENT, player)
+    player.time_left = lambda: (deadline - time.monotonic()) * 1000
+    player.tt.new_search()
+    player.start_move_ordering(game)
+
+    completed = []
+    moves = list(moves)
+    for depth in range(1, search_depth + 1):
+        player.depth = depth
+        try:
+            best_score, best_move = search_moves(player, game, moves, depth)
+        except SearchTimeout:
+            break
+        completed.append((depth, best_score, best_move))
+        if best_score > player.WIN_SCORE or best_score < -player.WIN_SCORE:
+            break
+        moves.remove(best_move)
+        moves.insert(0, best_move)
+    return completed
+
+
+def search_helper(data, first, table, score_fn, search_depth, depth_offset, seed, deadline, timeout):
+    """Run iterative deepening on the position in a Lazy SMP helper process,
+    storing the results in the shared transposition table, until the
+    deadline or until the main process stops the table.
+
+    Parameters
+    ----------
+    table : (str, int)
+        Name and size of the `SharedTranspositionTable`.
+
+    depth_offset : int
+        Number of iterations to skip, so helpers search other depths than
+        the main process.
+
+    seed : hashable
+        Seed of the move order of the helper.
+
+    Returns
+    -------
+    int
+        The depth of the last completed iteration.
+    """
+    player = shared_table_player(table, score_fn, search_depth, deadline, timeout)
+    game = (Board.from_bytes(data, player, OPPONENT, seed=seed) if first else
+            Board.from_bytes(data, OPPONENT, player, seed=seed))
+    player.start_move_ordering(game)
+
+    completed = 0
+    for depth in range(1 + depth_offset, search_depth + 1):
+        player.depth = depth
+        try:
+            player.alphabeta(game, depth)
+        except SearchTimeout:
+            break
+        completed = depth
+        if player.solved:
+            break
+    return completed
+
+
+def ponder_positions(positions, first, table, score_fn, search_depth, deadline, timeout):
+    """Search the positions that can follow the move of the opponent in a
+    pondering process, one iteration of every position after the other so
+    all of them are searched to the same depth, storing the results in the
+    shared transposition table until the deadline or until the table is
+    stopped.
+
+    Parameters
+    ----------
+    positions : list<bytes>
+        The positions serialized with `Board.to_bytes`, most likely first.
+
+    first : bool
+        True if the pondering player is player 1 of the games.
+
+    table : (str, int)
+        Name and size of the `SharedTranspositionTable`.
+
+    Returns
+    -------
+    int
+        The depth every position was searched to.
+    """
+    player = shared_table_player(table, score_fn, search_depth, deadline, timeout)
+    games = [Board.from_bytes(data, player, OPPONENT) if first else Board.from_bytes(data, OPPONENT, player)
+             for data in positions]
+    player.start_move_ordering(games[0])
+
+    completed = 0
+    for depth in range(1, search_depth + 1):
+        player.depth = depth
+        try:
+            for game in games:
+                player.alphabeta(game, depth)
+        except SearchTimeout:
+            break
+        completed = depth
+    return completed
+
+
+def shared_table_player(table, score_fn, search_depth, deadline, timeout):
+    """Return the search player of this worker process using the shared
+    transposition table, with a time_left running out at the deadline or
+    as soon as the table is stopped."""
+    name, size = table
+    tt = _shared_tables.get(name)
+    if tt is None:
+        tt = SharedTranspositionTable(size, name=name)
+        _shared_tables[name] = tt
+    key = (score_fn, name, timeout)
+    player = _worker_players.get(key)
+    if player is None:
+        player = AlphaBetaPlayer1(search_depth=search_depth, score_fn=score_fn, timeout=timeout)
+        player.tt = tt
+        _worker_players[key] = player
+    player.time_left = lambda: 0. if tt.stopped else (deadline - time.monotonic()) * 1000
+    return player
+
+
+def search_moves(player, game, moves, depth):
+    """Return the best score and move among moves, searched to the given depth
+    with the alpha-beta search of the player."""
+    best_score, best_move = float("-inf"), moves[0]
+    for move in moves:
+        score = player.min_value(game.forecast_move(move), depth - 1, best_score, float("inf"))
+        if score > best_score:
+            best_score, best_move = score, move
+    return best_score, best_move
+
+
+class ParallelPlayer(AlphaBetaPlayer1):
+    """Base class of the players searching with other processes, making them
+    context managers. Subclasses define start, acquiring their processes and
+    shared memory, and close, releasing them."""
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class RootSplitPlayer(ParallelPlayer):
+    """Game-playing agent that splits the root moves of iterative deepening
+    alpha-beta search between worker processes.
+
+    Parameters
+    ----------
+    workers : int (optional)
+        Number of worker processes, one less than the number of cores by
+        default.
+    """
+
+    def __init__(self, search_depth=3, score_fn=custom_score, timeout=30., tt_size=1 << 16, workers=None):
+        super().__init__(search_depth=search_depth, score_fn=score_fn, timeout=timeout, tt_size=tt_size)
+        self.tt_size = tt_size
+        self.workers = workers or max(1, (os.cpu_count() or 2) - 1)
+        self.pool = None
+
+    def start(self):
+        """Start the worker processes, so that they are ready before the first
+        move. Called by get_move if needed."""
+        if self.pool is None:
+            self.pool = ProcessPoolExecutor(max_workers=self.workers)
+
+    def close(self):
+        """Stop the worker processes, which frees their transposition
+        tables."""
+        if self.pool is not None:
+            self.pool.shutdown()
+            self.pool = None
+
+    def search(self, game, time_left):
+        """Search the moves in the worker processes, see
+        `AlphaBetaPlayer1.search`. Only the depth reached and the timeouts are
+        recorded in self.stats, the nodes are counted by the workers."""
+        self.time_left = time_left
+        moves = game.get_legal_moves()
+        if len(moves) < 2:
+            return moves[0] if moves else (-1, -1)
+        best_move = endgame_move(self, game)
+        if best_move is not None:
+            return best_move
+
+        # deal the moves round-robin in the order of their static score so
+        # that every worker gets a share of the promising ones
+        moves.sort(key=lambda move: self.score(game.forecast_move(move), self), reverse=True)
+        best_move = moves[0]
+        self.start()
+
+        deadline = time.monotonic() + (time_left() - self.TIMER_THRESHOLD) / 1000
+        data = game.to_bytes()
+        first = not game.check()[2] # the searching player holds the initiative
+        futures = [self.pool.submit(search_root_moves, data, first, moves[i::self.workers], self.score,
+                                    self.search_depth, deadline, self.tt_size, self.TIMER_THRESHOLD)
+                   for i in range(min(self.workers, len(moves)))]
+        done, _ = wait(futures, timeout=max(0., time_left() - self.TIMER_THRESHOLD / 2) / 1000)
+        if len(done) < len(futures):
+            self.stats.timed_out = True
+            return best_move # a worker missed the deadline, its moves were not compared
+
+        return self.merge([future.result() for future in futures], best_move)
+
+    def merge(self, results, default):
+        """Return the best move at the deepest iteration completed by every
+        worker. A worker that proved a win or a loss stops early, its last
+        result stands for every deeper iteration."""
+        depth = self.search_depth
+        for completed in results:
+            if not completed:
+                return default
+            last_depth, last_score, _ = completed[-1]
+            if -self.WIN_SCORE <= last_score <= self.WIN_SCORE:
+                depth = min(depth, last_depth)
+        self.depth = self.stats.depth = depth
+
+        best_score, best_move = float("-inf"), default
+        for completed in results:
+            _, score, move = completed[min(depth, len(completed)) - 1]
+            if score > best_score:
+                best_score, best_move = score, move
+        self.best_score = best_score
+        return best_move
+
+
+class LazySMPPlayer(ParallelPlayer):
+    """Game-playing agent running the iterative deepening alpha-beta search of
+    `AlphaBetaPlayer1` with helper processes that share its transposition
+    table (Lazy SMP).
+
+    Parameters
+    ----------
+    helpers : int (optional)
+        Number of helper processes, one less than the number of cores by
+        default.
+    """
+
+    def __init__(self, search_depth=3, score_fn=custom_score, timeout=30., tt_size=1 << 16,
+                 aspiration_window=1., aspiration_growth=4., helpers=None):
+        super().__init__(search_depth=search_depth, score_fn=score_fn, timeout=timeout, tt_size=1,
+                         aspiration_window=aspiration_window, aspiration_growth=aspiration_growth)
+        self.tt_size = tt_size
+        self.tt = None # the shared table, created by start
+        self.helpers = max(1, (os.cpu_count() or 2) - 1) if helpers is None else helpers
+        self.pool = None
+
+    def start(self):
+        """Create the shared transposition table and start the helper
+        processes, so that they are ready before the first move. Called by
+        get_move if needed."""
+        if self.tt is None:
+            self.tt = SharedTranspositionTable(self.tt_size)
+        if self.pool is None and self.helpers:
+            self.pool = ProcessPoolExecutor(max_workers=self.helpers)
+
+    def close(self):
+        """Stop the helper processes and free the shared transposition table."""
+        if self.pool is not None:
+            self.pool.shutdown()
+            self.pool = None
+        if self.tt is not None:
+            self.tt.close()
+            self.tt = None
+
+    def get_move(self, game, time_left):
+        self.start()
+        if not self.helpers or len(game.get_legal_moves()) < 2 or game.is_partitioned():
+            return super().get_move(game, time_left) # nothing to share
+
+        self.tt.new_search()
+        deadline = time.monotonic() + (time_left() - self.TIMER_THRESHOLD) / 1000
+        data = game.to_bytes()
+        first = not game.check()[2] # the searching player holds the initiative
+        table = (self.tt.name, self.tt.size)
+        futures = [self.pool.submit(search_helper, data, first, table, self.score, self.search_depth,
+                                    i % 2, (game.hash(), i), deadline, self.TIMER_THRESHOLD)
+                   for i in range(self.helpers)]
+        try:
+            return super().get_move(game, time_left)
+        finally:
+            self.tt.stop()
+            wait(futures, timeout=max(0., time_left() - self.TIMER_THRESHOLD / 2) / 1000)
+
+
+class PonderingPlayer(ParallelPlayer):
+    """Game-playing agent using the iterative deepening alpha-beta search of
+    `AlphaBetaPlayer1`, that ponders the replies of the opponent in a
+    background process during the turn of the opponent.
+
+    Parameters
+    ----------
+    ponder_time : float (optional)
+        Longest time in milliseconds spent pondering a position, in case the
+        game stops without the player being told.
+    """
+
+    def __init__(self, search_depth=3, score_fn=custom_score, timeout=30., tt_size=1 << 16,
+                 aspiration_window=1., aspiration_growth=4., ponder_time=10000.):
+        super().__init__(search_depth=search_depth, score_fn=score_fn, timeout=timeout, tt_size=1,
+                         aspiration_window=aspiration_window, aspiration_growth=aspiration_growth)
+        self.tt_size = tt_size
+        self.tt = None # the shared table, created by start
+        self.ponder_time = ponder_time
+        self.pool = None
+        self.ponder = None
+
+    def start(self):
+        """Create the shared transposition table and start the pondering
+        process, so that they are ready before the first move. Called by
+        notify_move and get_move if needed."""
+        if self.tt is None:
+            self.tt = SharedTranspositionTable(self.tt_size)
+        if self.pool is None:
+            self.pool = ProcessPoolExecutor(max_workers=1)
+
+    def close(self):
+        """Stop the pondering process and free the shared transposition
+        table."""
+        self.stop_pondering()
+        if self.pool is not None:
+            self.pool.shutdown()
+            self.pool = None
+        if self.tt is not None:
+            self.tt.close()
+            self.tt = None
+
+    def notify_move(self, game, move):
+        """Called by `Board.play` after every move: start pondering the
+        replies of the opponent after a move of this player, stop when the
+        opponent has moved."""
+        if game.inactive_player != self:
+            self.stop_pondering()
+            return
+        replies = game.get_legal_moves()
+        if not replies:
+            return
+        # the replies the player expects the opponent to choose come first
+        replies.sort(key=lambda reply: self.score(game.forecast_move(reply), self))
+        self.start()
+        self.tt.new_search()
+        positions = [game.forecast_move(reply).to_bytes() for reply in replies]
+        first = game.check()[2] == 1 # the opponent holds the initiative
+        self.ponder = self.pool.submit(ponder_positions, positions, first, (self.tt.name, self.tt.size),
+                                       self.score, self.search_depth,
+                                       time.monotonic() + self.ponder_time / 1000, self.TIMER_THRESHOLD)
+
+    def stop_pondering(self):
+        """Stop the ponder in progress, if any, and wait for the pondering
+        process to be idle."""
+        if self.ponder is not None:
+            self.tt.stop()
+            wait([self.ponder])
+            self.ponder = None
+
+    def get_move(self, game, time_left):
+        self.stop_pondering() # in case the game doesn't notify the moves
+        self.start()
+        return super().get_move(game, time_left)
@@ -0,0 +1,198 @@
+"""Perft: move generation benchmark and correctness check of the boards.
+
+perft(n) is the number of leaves of the game tree of a position cut at n
+plies: the positions reached after n plies, and the positions where the
+game ended earlier, the player to move being stuck. It only exercises move
+generation and making moves, so it measures the raw speed of a board apart
+from any search, and the counts are a fingerprint of the rules: an
+optimization of `Board` or `BitBoard` that changes one of them is a bug.
+
+Positions are walked in two ways:
+
+    forecast : forecast_move, one new board per move, like the search of
+               MinimaxPlayer and AlphaBetaPlayer
+    apply    : apply_move and undo_move on a single board, like the search
+               of AlphaBetaPlayer1 (reverse_move takes the same path when
+               the undo stack holds the move)
+
+Positions are built for every board size by a seeded random game choosing
+among the sorted legal moves, so they don't depend on the move order of the
+board. The counts are compared to the REFERENCE values. Every walk reports
+its speed in leaves per second, the number of boards it allocated and, with
+--memory, the peak of the memory it allocated (traced by tracemalloc in a
+second run, tracing slows the walk down too much to time it).
+
+    python perft.py                     # every size, position and board
+    python perft.py --size 7 7 --depth 5 --memory
+"""
+import argparse
+import itertools
+import random
+import sys
+import time
+import tracemalloc
+
+from isolation import Board, BitBoard
+
+# (name, fraction of the cells played from the empty board, perft depth)
+POSITIONS = [
+    ('empty', 0., 4),
+    ('opening', .05, 6),
+    ('midgame', .3, 8),
+    ('endgame', .55, 16),
+]
+
+SIZES = [(5, 5), (7, 7), (8, 6)]
+
+BOARDS = {'board': Board, 'bitboard': BitBoard}
+
+# (width, height, position name, depth) -> perft count
+REFERENCE = {
+    (5, 5, 'empty', 4): 7712,
+    (5, 5, 'opening', 6): 8340,
+    (5, 5, 'midgame', 8): 738,
+    (5, 5, 'endgame', 16): 70,
+    (7, 7, 'empty', 4): 52672,
+    (7, 7, 'opening', 6): 6621,
+    (7, 7, 'midgame', 8): 10281,
+    (7, 7, 'endgame', 16): 2095,
+    (8, 6, 'empty', 4): 49136,
+    (8, 6, 'opening', 6): 3899,
+    (8, 6, 'midgame', 8): 17113,
+    (8, 6, 'endgame', 16): 122,
+}
+
+
+def make_position(board_class, width, height, fraction):
+    """Return the board reached from the empty board by a random game filling
+    the given fraction of the cells, the same for every board class. Moves
+    are picked among the sorted legal moves, and games are replayed with the
+    next seed until one leaves both players at least two moves."""
+    for seed in itertools.count():
+        game = board_class("player1", "player2", width, height, shuffle=False)
+        rng = random.Random("{}x{}:{}".format(width, height, seed))
+        for _ in range(int(fraction * width * height)):
+            moves = sorted(game.get_legal_moves())
+            if not moves:
+                break
+            game.apply_move(rng.choice(moves))
+        if game.count_moves(game.active_player) >= 2 and game.count_moves(game.inactive_player) >= 2:
+            return game
+
+
+def perft_forecast(game, depth):
+    """Return perft(depth) walking the tree with forecast_move."""
+    if depth == 0:
+        return 1
+    moves = game.get_legal_moves()
+    if not moves:
+        return 1
+    nodes = 0
+    for move in moves:
+        nodes += perft_forecast(game.forecast_move(move), depth - 1)
+    return nodes
+
+
+def perft_apply(game, depth):
+    """Return perft(depth) walking the tree with apply_move and undo_move on
+    the board itself, which is left unchanged."""
+    if depth == 0:
+        return 1
+    moves = game.get_legal_moves()
+    if not moves:
+        return 1
+    nodes = 0
+    for move in moves:
+        nodes += perft_apply(game.apply_move(move), depth - 1)
+        game.undo_move()
+    return nodes
+
+
+PATHS = {'forecast': perft_forecast, 'apply': perft_apply}
+
+
+def tree_size(game, depth):
+    """Return the number of positions of the tree of perft(depth), the root
+    included. The forecast walk allocates a board for each of them but the
+    root."""
+    if depth == 0:
+        return 1
+    nodes = 1
+    for move in game.get_legal_moves():
+        nodes += tree_size(game.apply_move(move), depth - 1)
+        game.undo_move()
+    return nodes
+
+
+def measure(path, game, depth, memory=False):
+    """Run a perft walk and return (count, seconds, boards allocated, peak
+    bytes). The peak of the memory allocated by the walk is measured by a
+    second, untimed run under tracemalloc if memory is True, it is None
+    otherwise."""
+    walk = PATHS[path]
+    start = time.perf_counter()
+    count = walk(game, depth)
+    seconds = time.perf_counter() - start
+    boards = tree_size(game, depth) - 1 if path == 'forecast' else 0
+    peak = None
+    if memory:
+        tracemalloc.start()
+        walk(game, depth)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return count, seconds, boards, peak
+
+
+def run(sizes=SIZES, positions=POSITIONS, boards=BOARDS, paths=PATHS, depth=None, memory=False, out=sys.stdout):
+    """Run perft for every combination, print a report line for each one
+    and return the list of mismatches, as (width, height, position, depth,
+    expected, found) tuples. Counts are checked against the REFERENCE
+    values, or against the count of the first board and path for depths
+    without reference."""
+    errors = []
+    print("{:>5} {:>8} {:>5} {:>8} {:>8} {:>12} {:>8} {:>12} {:>10} {:>10}".format(
+        "size", "position", "depth", "board", "path", "count", "seconds", "nodes/s", "boards", "peak KiB"), file=out)
+    for width, height in sizes:
+        for name, fraction, default_depth in positions:
+            n = default_depth if depth is None else depth
+            expected = REFERENCE.get((width, height, name, n))
+            reference = expected is not None
+            for board_name in boards:
+                game = make_position(BOARDS[board_name], width, height, fraction)
+                for path in paths:
+                    count, seconds, allocated, peak = measure(path, game, n, memory)
+                    status = "" if reference else "no reference"
+                    if expected is None:
+                        expected = count # without reference the boards and paths must still agree
+                    elif count != expected:
+                        status = "MISMATCH, expected {}".format(expected)
+                        errors.append((width, height, name, n, expected, count))
+                    print("{:>5} {:>8} {:>5} {:>8} {:>8} {:>12} {:>8.3f} {:>12.0f} {:>10} {:>10} {}".format(
+                        "{}x{}".format(width, height), name, n, board_name, path, count, seconds,
+                        count / seconds if seconds > 0 else 0., allocated,
+                        "-" if peak is None else "{:.1f}".format(peak / 1024), status), file=out)
+    return errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Count and time move sequences of the boards.")
+    parser.add_argument('--size', type=int, nargs=2, action='append', metavar=('WIDTH', 'HEIGHT'),
+                        help="board size, repeat for several sizes (default: {})".format(SIZES))
+    parser.add_argument('--position', choices=[name for name, _, _ in POSITIONS], action='append',
+                        help="start position, repeat for several (default: all)")
+    parser.add_argument('--depth', type=int, default=None, help="perft depth (default: per position)")
+    parser.add_argument('--board', choices=sorted(BOARDS), action='append', help="board class (default: both)")
+    parser.add_argument('--path', choices=sorted(PATHS), action='append', help="tree walk (default: both)")
+    parser.add_argument('--memory', action='store_true', help="measure the peak memory of every walk")
+    args = parser.parse_args()
+
+    sizes = [tuple(size) for size in args.size] if args.size else SIZES
+    positions = [position for position in POSITIONS if not args.position or position[0] in args.position]
+    errors = run(sizes, positions, args.board or list(BOARDS), args.path or list(PATHS), args.depth, args.memory)
+    if errors:
+        print("{} counts differ from the reference".format(len(errors)))
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -65,7 +65,7 @@ def open_move_score(game, player):
     if game.is_winner(player):
         return float("inf")
 
-    return float(len(game.get_legal_moves(player)))
+    return float(game.count_moves(player))
 
 def open_move_score_mod(game, player):
     """The basic evaluation function described in lecture that outputs a score
@@ -94,7 +94,7 @@ def open_move_score_mod(game, player):
     if game.is_winner(player):
         return float("inf")
 
-    return float(len(game.get_legal_moves(player))) + (1 - center_score(game,player)/1000)
+    return float(game.count_moves(player)) + (1 - center_score(game,player)/1000)
 
 def improved_score(game, player):
     """The "Improved" evaluation function discussed in lecture that outputs a
@@ -123,8 +123,8 @@ def improved_score(game, player):
     if game.is_winner(player):
         return float("inf")
 
-    own_moves = len(game.get_legal_moves(player))
-    opp_moves = len(game.get_legal_moves(game.get_opponent(player)))
+    own_moves = game.count_moves(player)
+    opp_moves = game.count_moves(game.get_opponent(player))
     return float(own_moves - opp_moves)
 
 def improved_score_sym(game, player):
@@ -164,8 +164,8 @@ def improved_score_sym(game, player):
             score = 1e6
 
 
-    own_moves = len(game.get_legal_moves(player))
-    opp_moves = len(game.get_legal_moves(game.get_opponent(player)))
+    own_moves = game.count_moves(player)
+    opp_moves = game.count_moves(game.get_opponent(player))
     score += (own_moves - opp_moves)
     return score
 
@@ -197,8 +197,8 @@ def improved_score_mod(game, player):
     if game.is_winner(player):
         return float("inf")
 
-    own_moves = len(game.get_legal_moves(player))
-    opp_moves = len(game.get_legal_moves(game.get_opponent(player)))
+    own_moves = game.count_moves(player)
+    opp_moves = game.count_moves(game.get_opponent(player))
     return float(own_moves - opp_moves + center_score(game,player)/32)
 
 def center_score(game, player):
@@ -0,0 +1,114 @@
+"""Instrumentation of the search players.
+
+Every `IsolationPlayer` owns a `SearchStats` object. The searches only bump
+integer counters on it (one attribute increment per node), everything else
+is computed when a move is finished, so the instrumentation costs next to
+nothing and stays on in tournaments.
+
+The counters of the last move are on the object itself, and a summary of
+every move is kept in `moves` (the most recent ones only), so after a game
+
+    for move in player.stats.moves:
+        print(move['depth'], move['nodes'], move['branching'])
+
+shows how deep the player searched and how much work it took.
+"""
+import time
+from collections import deque
+
+
+class SearchStats:
+    """Counters of the search of one move.
+
+    Attributes
+    ----------
+    nodes : int
+        Positions searched, leaves included.
+
+    leaves : int
+        Positions scored without searching their moves: the horizon of the
+        search and positions without legal moves.
+
+    tt_probes, tt_hits : int
+        Transposition table lookups, and lookups that found the position.
+
+    cutoffs : list<int>
+        Beta cutoffs by index of the move that caused them in the ordered
+        list of moves. Good move ordering puts most of them at index 0.
+
+    depth : int
+        Deepest iterative deepening iteration completed.
+
+    timed_out : bool
+        True if the search of the move was stopped by SearchTimeout.
+
+    iterations : list<(int, float, int)>
+        (depth, seconds, nodes) of every completed iteration.
+
+    Parameters
+    ----------
+    keep : int (optional)
+        Number of per move summaries kept in `moves`.
+    """
+
+    def __init__(self, keep=1000):
+        self.moves = deque(maxlen=keep)
+        self.start()
+
+    def start(self):
+        """Reset the counters at the beginning of a move."""
+        self.nodes = 0
+        self.leaves = 0
+        self.tt_probes = 0
+        self.tt_hits = 0
+        self.cutoffs = []
+        self.depth = 0
+        self.timed_out = False
+        self.iterations = []
+        self._start = self._last = time.perf_counter()
+        self._last_nodes = 0
+
+    def cutoff(self, index):
+        """Record a beta cutoff by the move at index in the ordered moves."""
+        cutoffs = self.cutoffs
+        if index >= len(cutoffs):
+            cutoffs.extend([0] * (index + 1 - len(cutoffs)))
+        cutoffs[index] += 1
+
+    def iteration_done(self, depth):
+        """Record a completed iterative deepening iteration."""
+        now = time.perf_counter()
+        self.iterations.append((depth, now - self._last, self.nodes - self._last_nodes))
+        self._last, self._last_nodes = now, self.nodes
+        self.depth = depth
+
+    def branching(self):
+        """Effective branching factor: growth of the nodes searched from the
+        second to last completed iteration to the last one, None before two
+        iterations are completed."""
+        if len(self.iterations) < 2 or not self.iterations[-2][2]:
+            return None
+        return self.iterations[-1][2] / self.iterations[-2][2]
+
+    def summary(self):
+        """Return the statistics of the move as a dict."""
+        seconds = time.perf_counter() - self._start
+        return {
+            'nodes': self.nodes,
+            'leaves': self.leaves,
+            'tt_probes': self.tt_probes,
+            'tt_hits': self.tt_hits,
+            'cutoffs': list(self.cutoffs),
+            'depth': self.depth,
+            'timed_out': self.timed_out,
+            'iterations': list(self.iterations),
+            'branching': self.branching(),
+            'seconds': seconds,
+            'nodes_per_second': self.nodes / seconds if seconds > 0 else 0.,
+        }
+
+    def finish(self):
+        """Store the summary of the move in `moves` and return it."""
+        summary = self.summary()
+        self.moves.append(summary)
+        return summary
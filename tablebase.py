@@ -0,0 +1,254 @@
+"""Retrograde endgame tablebase for positions with few open cells.
+
+Late in the game the outcome only depends on the locations of the two
+players and on the open region: the blank cells at least one of them can
+still reach. Cells that neither player can reach never matter again. A
+position is therefore keyed by (region, mover, other), the region as a
+bitmask and the cell indices of the player to move and of its opponent.
+
+Every move removes the target cell from the region, and the region of the
+next position is what stays reachable from the new locations, so a position
+only leads to positions with smaller regions. The generator works up from
+the empty region one layer (region size) at a time: the positions of a layer
+are enumerated by adding one cell to the regions of the layer below, and
+each one is solved from the already stored values of its successors. A
+layer is split in chunks, one per location of the player to move, that are
+solved in parallel by a pool of processes. Each chunk is written to its own
+zlib compressed file, and chunks found on disk are skipped, so an
+interrupted run resumes where it stopped.
+
+A chunk file holds the sorted 8 byte keys of its positions followed by one
+value byte per position. Chunks are kept in memory in that form and searched
+with a binary search, which takes 9 bytes per position instead of the
+hundred of a dict entry.
+
+Values are (mover wins, distance): the number of plies until the loser is
+to move without a legal move.
+
+Generate the table for regions of up to 5 cells with
+
+    python tablebase.py --cells 5 --path tablebase
+"""
+import argparse
+import os
+import sys
+import zlib
+from array import array
+from bisect import bisect_left
+from concurrent.futures import ProcessPoolExecutor
+
+from isolation import Board
+from isolation.bitboard import _get_tables, flood_fill
+
+# bits used for a location in the position keys
+LOCATION_BITS = 6
+
+# (path, width, height, size, mover) -> chunk, the chunks read by this process
+_loaded = {}
+
+
+def position_key(region, mover, other, cells):
+    """Pack a position into an integer: the region mask, then the cell
+    indices of the player to move and of its opponent."""
+    return region | mover << cells | other << (cells + LOCATION_BITS)
+
+
+def chunk_path(path, width, height, size, mover):
+    """Return the file of the positions of the layer with the player to
+    move at the given cell index."""
+    return os.path.join(path, "{}x{}".format(width, height), "layer{:02d}_{:02d}.tbz".format(size, mover))
+
+
+def read_chunk(filename):
+    """Return the (keys, values) of a chunk file: the sorted keys of its
+    positions and the value byte of each of them, distance << 1 | mover wins.
+    """
+    with open(filename, 'rb') as chunk_file:
+        data = zlib.decompress(chunk_file.read())
+    count = len(data) // 9
+    keys = array('Q')
+    keys.frombytes(data[:8 * count])
+    if sys.byteorder == 'big':
+        keys.byteswap()
+    return keys, data[8 * count:]
+
+
+def write_chunk(filename, values):
+    """Write the {key: value} positions of a chunk, to a temporary file first
+    so that an interrupted run never leaves a partial chunk behind."""
+    keys = array('Q', sorted(values))
+    data = bytes(values[key] for key in keys)
+    if sys.byteorder == 'big':
+        keys.byteswap()
+    with open(filename + '.tmp', 'wb') as chunk_file:
+        chunk_file.write(zlib.compress(keys.tobytes() + data, 9))
+    os.replace(filename + '.tmp', filename)
+
+
+def chunk_value(chunk, key):
+    """Return the value byte of the position in the chunk, or None."""
+    keys, values = chunk
+    index = bisect_left(keys, key)
+    if index < len(keys) and keys[index] == key:
+        return values[index]
+    return None
+
+
+def load_chunk(path, width, height, size, mover):
+    """Return a chunk, read from disk the first time it is needed in this
+    process."""
+    chunk = _loaded.get((path, width, height, size, mover))
+    if chunk is None:
+        chunk = read_chunk(chunk_path(path, width, height, size, mover))
+        _loaded[(path, width, height, size, mover)] = chunk
+    return chunk
+
+
+def layer_positions(path, width, height, size, mover):
+    """Return the (region, other) pairs of the positions of a layer with the
+    player to move at the given cell, built from the regions of the layer
+    below: every region of size n is a region of size n - 1, connected to
+    the players, plus one cell adjacent to it or to a player."""
+    knight, _, full = _get_tables(width, height)
+    cells = width * height
+    players_mask = (1 << LOCATION_BITS) - 1
+    if size == 0:
+        return {(0, other) for other in range(cells) if other != mover}
+    positions = set()
+    for key in read_chunk(chunk_path(path, width, height, size - 1, mover))[0]:
+        region = key & full
+        other = (key >> (cells + LOCATION_BITS)) & players_mask
+        border = knight[mover] | knight[other]
+        rest = region
+        while rest:
+            low = rest & -rest
+            rest ^= low
+            border |= knight[low.bit_length() - 1]
+        border &= ~(region | 1 << mover | 1 << other)
+        while border:
+            low = border & -border
+            border ^= low
+            positions.add((region | low, other))
+    return positions
+
+
+def solve_chunk(path, width, height, size, mover):
+    """Solve the positions of a layer with the player to move at the given
+    cell and write them to their chunk file. The chunks of the smaller
+    layers must be on disk."""
+    filename = chunk_path(path, width, height, size, mover)
+    if os.path.exists(filename):
+        return filename
+    knight, _, _ = _get_tables(width, height)
+    cells = width * height
+    chunk = {}
+    for region, other in layer_positions(path, width, height, size, mover):
+        win_distance = lose_distance = None
+        moves = knight[mover] & region
+        while moves:
+            low = moves & -moves
+            moves ^= low
+            target = low.bit_length() - 1
+            rest = region ^ low
+            child_region = (flood_fill(knight, knight[other] & rest, rest) |
+                            flood_fill(knight, knight[target] & rest, rest))
+            child = chunk_value(load_chunk(path, width, height, bin(child_region).count("1"), other),
+                                position_key(child_region, other, target, cells))
+            distance = (child >> 1) + 1
+            if child & 1:
+                # the opponent wins after this move, delay the loss
+                if lose_distance is None or distance > lose_distance:
+                    lose_distance = distance
+            elif win_distance is None or distance < win_distance:
+                win_distance = distance
+        if win_distance is not None:
+            value = win_distance << 1 | 1
+        else:
+            value = (lose_distance or 0) << 1
+        chunk[position_key(region, mover, other, cells)] = value
+    write_chunk(filename, chunk)
+    return filename
+
+
+def generate(path, max_cells, width=7, height=7, workers=None, verbose=False):
+    """Generate (or complete) the tablebase for regions of up to max_cells
+    cells, solving the chunks of every layer in parallel."""
+    os.makedirs(os.path.join(path, "{}x{}".format(width, height)), exist_ok=True)
+    if width * height + 2 * LOCATION_BITS > 64 or width * height > 1 << LOCATION_BITS:
+        raise ValueError("the position keys don't fit boards of {}x{}".format(width, height))
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for size in range(max_cells + 1):
+            jobs = [pool.submit(solve_chunk, path, width, height, size, mover)
+                    for mover in range(width * height)]
+            for job in jobs:
+                job.result()
+            if verbose:
+                print("layer {} done".format(size), flush=True)
+
+
+class Tablebase:
+    """Exact values of the positions with small open regions.
+
+    Parameters
+    ----------
+    path : str
+        Directory the tablebase was generated in.
+
+    max_cells : int (optional)
+        Largest region size to load, every complete layer on disk if None.
+    """
+
+    def __init__(self, path, width=7, height=7, max_cells=None):
+        self.width = width
+        self.height = height
+        size = 0
+        while ((max_cells is None or size <= max_cells) and
+               all(os.path.exists(chunk_path(path, width, height, size, mover))
+                   for mover in range(width * height))):
+            size += 1
+        self.max_cells = size - 1
+        self._chunks = {(size, mover): read_chunk(chunk_path(path, width, height, size, mover))
+                        for size in range(self.max_cells + 1) for mover in range(width * height)}
+
+    def probe(self, game):
+        """Return (active player wins, distance) for the position, distance
+        being the number of plies until the loser has no legal move, or None
+        if the position is not in the table."""
+        if game.width != self.width or game.height != self.height or self.max_cells < 0:
+            return None
+        mover = game._location_index(game.active_player)
+        other = game._location_index(game.inactive_player)
+        if mover == Board.NOT_MOVED or other == Board.NOT_MOVED:
+            return None
+        region = game.get_region(game.active_player, self.max_cells)
+        if region is None:
+            return None
+        other_region = game.get_region(game.inactive_player, self.max_cells)
+        if other_region is None:
+            return None
+        region |= other_region
+        size = bin(region).count("1")
+        if size > self.max_cells:
+            return None
+        value = chunk_value(self._chunks[(size, mover)], position_key(region, mover, other, self.width * self.height))
+        if value is None:
+            return None
+        return bool(value & 1), value >> 1
+
+    def __len__(self):
+        return sum(len(keys) for keys, _ in self._chunks.values())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate the endgame tablebase.")
+    parser.add_argument('--path', default='tablebase', help="directory of the table files")
+    parser.add_argument('--cells', type=int, default=5, help="largest open region size")
+    parser.add_argument('--workers', type=int, default=None, help="number of processes")
+    parser.add_argument('--size', type=int, nargs=2, default=(7, 7), metavar=('WIDTH', 'HEIGHT'))
+    args = parser.parse_args()
+    width, height = args.size
+    generate(args.path, args.cells, width, height, args.workers, verbose=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -53,8 +53,9 @@ def play_round(player1, player2, num_matches):
                 break
 
             stats[turnCounter] += (len (legal_player_moves)/num_matches)
-            #depth[turnCounter] += (game.active_player.depth/num_matches)
-            #print (game.active_player.depth)
+            if hasattr(game.active_player, 'stats'):
+                depth[turnCounter] += (game.active_player.stats.depth/num_matches)
+                print (game.active_player.stats.summary())
             turnCounter +=1
             game.apply_move(curr_move)
 
@@ -0,0 +1,132 @@
+"""Time allocation for the iterative deepening search agents.
+
+Without it a search starts a new iteration whenever time is left, and an
+iteration that can't finish is thrown away when SearchTimeout is raised.
+`TimeManager` measures the effective branching factor of the completed
+iterations (the growth of the work from one iteration to the next) to predict
+the cost of the next one, and only lets the search start it if it is expected
+to finish within the time allocated to the move.
+
+Quiet positions only get a fraction of the time available for the move.
+Critical positions, with few legal moves or a best move that changed in the
+last iteration, may use all of it. Forced moves don't need a search at all.
+"""
+import math
+
+
+class TimeManager:
+    """Decide whether an iterative deepening search should start another
+    iteration.
+
+    Parameters
+    ----------
+    soft_fraction : float (optional)
+        Fraction of the time available for the move that a quiet position
+        may use.
+
+    critical_moves : int (optional)
+        Positions with at most this many legal moves are critical.
+
+    max_branching : float (optional)
+        Cap on the measured branching factor. An iteration that was cheap
+        thanks to transposition table hits can make the next one look
+        much more expensive than the 8 knight moves of a position allow.
+    """
+
+    def __init__(self, soft_fraction=0.6, critical_moves=3, max_branching=8.):
+        self.soft_fraction = soft_fraction
+        self.critical_moves = critical_moves
+        self.max_branching = max_branching
+        self.time_left = None
+        self.budget = 0.
+        self.critical = False
+        self.unstable = False
+        self.branching = None
+        self.iterations = []
+        self._start = 0.
+        self._last = 0., 0
+        self._best_move = None
+
+    def start(self, time_left, timeout, legal_moves):
+        """Start timing a move.
+
+        Parameters
+        ----------
+        time_left : callable
+            The time_left function passed to get_move.
+
+        timeout : float
+            Time in milliseconds the search has to keep to return its move.
+
+        legal_moves : int
+            Number of legal moves of the player.
+        """
+        self.time_left = time_left
+        self._start = time_left()
+        self.budget = self._start - timeout
+        self.critical = legal_moves <= self.critical_moves
+        self.unstable = False
+        self.branching = None
+        self.iterations = []
+        self._last = 0., 0
+        self._best_move = None
+
+    def elapsed(self):
+        """Time in milliseconds spent on the move so far, always 0 for an
+        untimed search (time_left returning infinity)."""
+        if math.isinf(self._start):
+            return 0.
+        return self._start - self.time_left()
+
+    def iteration_done(self, best_move, nodes=None):
+        """Record a completed iteration.
+
+        Parameters
+        ----------
+        best_move : (int, int)
+            Best move found by the iteration.
+
+        nodes : int (optional)
+            Number of nodes searched for the move so far. Without it the
+            branching factor is measured on the time of the iterations.
+        """
+        elapsed = self.elapsed()
+        prev_elapsed, prev_nodes = self._last
+        spent = elapsed - prev_elapsed
+        work = spent if nodes is None else nodes - prev_nodes
+        self._last = elapsed, nodes or 0
+        self.iterations.append((spent, work))
+
+        # the odd and even iterations of alpha-beta don't grow alike, the
+        # geometric mean of the last two ratios smooths the estimate out
+        works = [work for _, work in self.iterations[-3:]]
+        ratios = [cur / prev for prev, cur in zip(works, works[1:]) if prev > 0]
+        if ratios:
+            product = 1.
+            for ratio in ratios:
+                product *= ratio
+            self.branching = min(self.max_branching, max(1., product ** (1. / len(ratios))))
+
+        self.unstable = self._best_move is not None and best_move != self._best_move
+        self._best_move = best_move
+
+    def limit(self):
+        """Time in milliseconds the move may use."""
+        if self.critical or self.unstable:
+            return self.budget
+        return self.budget * self.soft_fraction
+
+    def predicted(self):
+        """Predicted time in milliseconds of the next iteration, None until
+        two iterations have been completed."""
+        if self.branching is None:
+            return None
+        return self.iterations[-1][0] * self.branching
+
+    def can_start_iteration(self):
+        """Return True if the next iteration is expected to finish within the
+        time allocated to the move."""
+        predicted = self.predicted()
+        if predicted is None:
+            return self.elapsed() < self.limit()
+        return self.elapsed() + predicted <= self.limit()
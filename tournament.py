@@ -24,10 +24,12 @@ from sample_players import (RandomPlayer, GreedyPlayer, ImprovedPlayer, open_mov
 from game_agent import (MinimaxPlayer, #AlphaBetaPlayerPartialSort, AlphaBetaPlayerNoSort, AlphaBetaPlayerFullSort,
                         #AlphaBetaPlayerPartialSort1, AlphaBetaPlayerPartialSortDeep,custom_score, greedy_endgame_score,
                         #AlphaBetaPlayerPartialSort2, AlphaBetaPlayerPartialSort3, AlphaBetaPlayer,
-                        AlphaBetaPlayer, custom_score, AlphaBetaPlayer1,
+                        AlphaBetaPlayer, custom_score, AlphaBetaPlayer1, PVSPlayer,
                         custom_score_2, custom_score_3,custom_score_4,custom_score_5, custom_score61, custom_score62,
                         custom_score63, custom_score64, custom_score65, custom_score66, custom_score68,custom_score69,
                         custom_score67, custom_score611,custom_score612,custom_score613,custom_score614, custom_score615, custom_score616)
+from parallel_agent import RootSplitPlayer, LazySMPPlayer, PonderingPlayer
+from competition_agent import CustomPlayer
 
 NUM_MATCHES = 10000 # number of matches against each opponent
 TIME_LIMIT = 1000  # number of milliseconds before timeout
@@ -155,6 +157,11 @@ def main():
         #Agent(AlphaBetaPlayer1(search_depth=1, score_fn=open_move_score), "greedy_ab1"),
         #Agent(AlphaBetaPlayer1(search_depth=1, score_fn=improved_score), "improved_ab1"),
         Agent(AlphaBetaPlayer1(search_depth=3, score_fn=open_move_score), "greedy_ab3"),
+        #Agent(PVSPlayer(search_depth=3, score_fn=improved_score), "improved_pvs3"),
+        #Agent(RootSplitPlayer(search_depth=50, score_fn=improved_score), "improved_split"),
+        #Agent(LazySMPPlayer(search_depth=50, score_fn=improved_score), "improved_smp"),
+        #Agent(PonderingPlayer(search_depth=50, score_fn=improved_score), "improved_ponder"),
+        #Agent(CustomPlayer(timeout=10.), "mcts"),
         #Agent(AlphaBetaPlayer1(search_depth=7, score_fn=improved_score), "improved_ab7"),
         #Agent(AlphaBetaPlayer1(search_depth=3, score_fn=custom_score), "mixed_ab3"),
         #Agent(AlphaBetaPlayer1(search_depth=3, score_fn=custom_score_3), "linear_ab3"),
@@ -0,0 +1,196 @@
+"""Fixed-capacity transposition table for the alpha-beta search agents.
+
+Every bucket of the table holds two entries: a depth-preferred slot, only
+replaced by searches at least as deep or by entries from a newer search, and
+an always-replace slot that keeps the most recent entry that did not make it
+into the first one. The memory used by the table never grows, so it can be
+kept across iterative deepening iterations and across consecutive moves.
+
+`SharedTranspositionTable` has the same interface and lives in shared memory,
+so that the worker processes of a parallel search can share one table.
+"""
+import struct
+from multiprocessing import shared_memory
+
+# entry flags: the stored score is exact, a lower bound (fail high) or an
+# upper bound (fail low)
+EXACT = 0
+LOWER = 1
+UPPER = 2
+
+# a slot of the shared table: the key xored with the two other words, the
+# score (64 bit float) and the info word (depth, flag, move, generation)
+_ENTRY = struct.Struct('<QQQ')
+_SCORE = struct.Struct('<d')
+_INFO = struct.Struct('<BBBBxxxx')
+_NO_MOVE = 0xff
+
+
+class TranspositionTable:
+    """Transposition table keyed by the 64 bit Zobrist key of a position.
+
+    Entries are tuples (key, check, depth, flag, score, move, generation):
+    check is the value of `Board.check()` used to reject key collisions,
+    depth the remaining search depth of the stored result, flag one of EXACT,
+    LOWER or UPPER, move the best move found and generation the value of the
+    generation counter when the entry was stored.
+
+    Parameters
+    ----------
+    size : int (optional)
+        Number of buckets, rounded up to a power of two. The table holds at
+        most twice as many entries.
+    """
+
+    def __init__(self, size=1 << 16):
+        buckets = 1
+        while buckets < size:
+            buckets <<= 1
+        self._mask = buckets - 1
+        self._deep = [None] * buckets
+        self._recent = [None] * buckets
+        self.generation = 0
+
+    def new_search(self):
+        """Start a new search. Entries stored by older searches are kept, but
+        are the first to be replaced in the depth-preferred slots."""
+        self.generation += 1
+
+    def clear(self):
+        """Remove every entry from the table."""
+        self._deep = [None] * len(self._deep)
+        self._recent = [None] * len(self._recent)
+
+    def probe(self, key, check):
+        """Return the entry stored for the position, or None."""
+        idx = key & self._mask
+        entry = self._deep[idx]
+        if entry is not None and entry[0] == key and entry[1] == check:
+            return entry
+        entry = self._recent[idx]
+        if entry is not None and entry[0] == key and entry[1] == check:
+            return entry
+        return None
+
+    def store(self, key, check, depth, flag, score, move):
+        """Store the result of searching a position to the given depth."""
+        idx = key & self._mask
+        entry = (key, check, depth, flag, score, move, self.generation)
+        deep = self._deep[idx]
+        if deep is None or deep[0] == key or depth >= deep[2] or deep[6] != self.generation:
+            self._deep[idx] = entry
+        else:
+            self._recent[idx] = entry
+
+    def __len__(self):
+        return (len(self._deep) - self._deep.count(None) +
+                len(self._recent) - self._recent.count(None))
+
+
+class SharedTranspositionTable:
+    """Transposition table stored in a `multiprocessing.shared_memory` block,
+    shared without locks by the processes of a parallel search.
+
+    Every slot holds one 24 byte entry made of three 64 bit words: the
+    score, the info word and the key xored with both. A reader recomputes
+    the key from the three words, so an entry torn by two processes writing
+    the same slot at once doesn't match any key and is ignored. The score is
+    kept as a 64 bit float, exactly like in `TranspositionTable`, so both
+    tables give the same cutoffs. The info word packs the depth, the flag,
+    the best move (row and column on 4 bits each) and the generation. A
+    block header holds the generation counter and a stop flag shared by all
+    the processes.
+
+    `probe` returns the same tuples as `TranspositionTable.probe`, except that
+    the check is not stored: the 64 bit key alone identifies the position.
+
+    Parameters
+    ----------
+    size : int (optional)
+        Number of slots, rounded up to a power of two.
+
+    name : str (optional)
+        Name of the shared memory block of an existing table to attach to,
+        None to create a new table.
+    """
+
+    def __init__(self, size=1 << 16, name=None):
+        slots = 1
+        while slots < size:
+            slots <<= 1
+        self._mask = slots - 1
+        if name is None:
+            self._memory = shared_memory.SharedMemory(create=True, size=_ENTRY.size * (slots + 1))
+            self._memory.buf[:_ENTRY.size * (slots + 1)] = bytes(_ENTRY.size * (slots + 1))
+            self._owner = True
+        else:
+            self._memory = shared_memory.SharedMemory(name=name)
+            self._owner = False
+        self._buf = self._memory.buf
+
+    @property
+    def name(self):
+        """Name of the shared memory block, pass it to the constructor to
+        attach another process to the table."""
+        return self._memory.name
+
+    @property
+    def size(self):
+        """Number of slots of the table."""
+        return self._mask + 1
+
+    @property
+    def generation(self):
+        """Generation counter, from 1 to 255 once a search was started."""
+        return _ENTRY.unpack_from(self._buf, 0)[0]
+
+    @property
+    def stopped(self):
+        """True once stop was called, until the next new_search."""
+        return bool(_ENTRY.unpack_from(self._buf, 0)[1])
+
+    def new_search(self):
+        """Start a new search for every process sharing the table."""
+        _ENTRY.pack_into(self._buf, 0, self.generation % 255 + 1, 0, 0)
+
+    def stop(self):
+        """Ask every process searching with the table to stop."""
+        _ENTRY.pack_into(self._buf, 0, self.generation, 1, 0)
+
+    def clear(self):
+        """Remove every entry from the table."""
+        self._buf[_ENTRY.size:] = bytes(len(self._buf) - _ENTRY.size)
+
+    def probe(self, key, check):
+        """Return the entry stored for the position, or None."""
+        checked, score, info = _ENTRY.unpack_from(self._buf, _ENTRY.size * (1 + (key & self._mask)))
+        if checked ^ score ^ info != key or not info:
+            return None
+        score, = _SCORE.unpack(score.to_bytes(8, 'little'))
+        depth, flag, move, generation = _INFO.unpack(info.to_bytes(8, 'little'))
+        return (key, check, depth, flag, score, None if move == _NO_MOVE else (move & 15, move >> 4),
+                generation)
+
+    def store(self, key, check, depth, flag, score, move):
+        """Store the result of searching a position to the given depth."""
+        offset = _ENTRY.size * (1 + (key & self._mask))
+        generation = self.generation
+        checked, old_score, info = _ENTRY.unpack_from(self._buf, offset)
+        if (info and checked ^ old_score ^ info != key and (info >> 24) & 0xff == generation and
+                depth < info & 0xff):
+            return # keep the deeper entry of another position from this search
+        move = _NO_MOVE if move is None else move[0] | move[1] << 4
+        score = int.from_bytes(_SCORE.pack(score), 'little')
+        info = int.from_bytes(_INFO.pack(min(depth, 255), flag, move, generation), 'little')
+        _ENTRY.pack_into(self._buf, offset, key ^ score ^ info, score, info)
+
+    def close(self):
+        """Detach the table from this process, and free the shared memory
+        block if this process created it."""
+        self._buf.release()
+        self._memory.close()
+        if self._owner:
+            self._memory.unlink()
+
+    def __len__(self):
+        return sum(1 for slot in range(1, self.size + 1) if _ENTRY.unpack_from(self._buf, _ENTRY.size * slot)[2])